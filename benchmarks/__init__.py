@@ -0,0 +1,4 @@
+"""Endpoint benchmarks for the app.
+
+Run ``python -m benchmarks --help`` from the project root.
+"""
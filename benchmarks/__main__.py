@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""Command line entry point: ``python -m benchmarks``."""
+import json
+import logging
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+import click
+
+from my_flask_app.app import create_app
+from my_flask_app.extensions import db
+
+from . import runner, settings
+from .seed import is_seeded, seed
+
+
+@click.command()
+@click.option(
+    "-s",
+    "--scale",
+    "scales",
+    type=int,
+    multiple=True,
+    default=[1000, 100000],
+    show_default=True,
+    help="Number of courses and of feedback rows to seed; repeatable",
+)
+@click.option(
+    "-n",
+    "--requests",
+    default=50,
+    show_default=True,
+    help="Timed requests per endpoint",
+)
+@click.option(
+    "-e",
+    "--endpoint",
+    "endpoints",
+    multiple=True,
+    type=click.Choice([name for name, *_ in runner.ENDPOINTS]),
+    help="Only benchmark these endpoints; repeatable",
+)
+@click.option(
+    "-d",
+    "--workdir",
+    type=click.Path(file_okay=False),
+    default=os.path.join(tempfile.gettempdir(), "my_flask_app-bench"),
+    show_default=True,
+    help="Where the seeded SQLite databases are kept and reused",
+)
+@click.option(
+    "--description-size",
+    default=2000,
+    show_default=True,
+    help="Characters of description per seeded course",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False),
+    default="bench_results.json",
+    show_default=True,
+    help="Machine-readable results file",
+)
+@click.option(
+    "-c",
+    "--compare",
+    "baseline",
+    type=click.File("r"),
+    default=None,
+    help="Earlier results file to compare against",
+)
+@click.option(
+    "--threshold",
+    default=1.2,
+    show_default=True,
+    help="Growth factor reported as a regression when comparing",
+)
+def main(
+    scales,
+    requests,
+    endpoints,
+    workdir,
+    description_size,
+    output,
+    baseline,
+    threshold,
+):
+    """Seed databases at each scale and benchmark the HTTP endpoints."""
+    os.makedirs(workdir, exist_ok=True)
+    results = {"scales": {}}
+    for scale in scales:
+        path = os.path.join(workdir, f"bench-{scale}.db")
+        config = {name: getattr(settings, name) for name in dir(settings)}
+        config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+        app = create_app(SimpleNamespace(**config))
+        app.logger.setLevel(logging.CRITICAL)
+        with app.app_context():
+            seconds = None
+            if not is_seeded(scale, scale):
+                db.session.remove()
+                db.engine.dispose()
+                if os.path.exists(path):
+                    os.remove(path)
+                click.echo(f"Seeding {scale} courses and feedback rows...")
+                seconds = seed(scale, scale, description_size=description_size)
+        click.echo(f"Benchmarking scale {scale}...")
+        endpoints_result = runner.run_endpoints(app, requests, only=endpoints)
+        for name, metrics in endpoints_result.items():
+            click.echo(
+                f"  {name:<20} p50 {metrics['p50_ms']:>10.2f} ms  "
+                f"p99 {metrics['p99_ms']:>10.2f} ms  "
+                f"peak {metrics['peak_kib']:>10.1f} KiB  status {metrics['status']}"
+            )
+        results["scales"][str(scale)] = {
+            "seed_seconds": seconds,
+            "endpoints": endpoints_result,
+        }
+    results["meta"] = runner.metadata()
+    results["meta"]["requests"] = requests
+
+    with open(output, "w") as results_file:
+        json.dump(results, results_file, indent=2)
+    click.echo(f"Results written to {output}")
+
+    if baseline is not None:
+        regressions = 0
+        for scale, endpoint, metric, old, new, regressed in runner.compare(
+            json.load(baseline), results, threshold
+        ):
+            regressions += regressed
+            flag = "REGRESSED" if regressed else ""
+            click.echo(
+                f"  {scale:>8} {endpoint:<20} {metric:<9} {old:>10} -> {new:>10} {flag}"
+            )
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
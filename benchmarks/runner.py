@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""Measure endpoint latency and memory, and compare result files."""
+import itertools
+import platform
+import resource
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from .seed import PASSWORD
+
+_registrations = itertools.count()
+
+
+def _register_form(iteration):
+    number = next(_registrations)
+    return {
+        "firstName": "Bench",
+        "lastName": "Marker",
+        "email": f"bench{number}-{time.time_ns()}@example.com",
+        "password": PASSWORD,
+        "confirm": PASSWORD,
+    }
+
+
+#: ``(name, method, path, form data builder)`` of every benchmarked endpoint.
+ENDPOINTS = [
+    ("tables", "GET", "/tables", None),
+    ("feedbacks", "GET", "/feedbacks", None),
+    ("dashboard_summary", "GET", "/dashboard/summary", None),
+    ("dashboard_barchart", "GET", "/dashboard/barchart", None),
+    ("dashboard_piechart", "GET", "/dashboard/piechart", None),
+    ("dashboard_bundle", "GET", "/dashboard/bundle", None),
+    (
+        "login",
+        "POST",
+        "/login",
+        lambda iteration: {"username": "user0", "password": PASSWORD},
+    ),
+    ("register", "POST", "/reg", _register_form),
+]
+
+
+def _percentile(samples, fraction):
+    """Nearest-rank percentile of sorted ``samples``."""
+    index = max(0, min(len(samples) - 1, round(fraction * len(samples)) - 1))
+    return samples[index]
+
+
+def _request(client, method, path, data):
+    response = client.open(path, method=method, data=data)
+    body = response.get_data()
+    response.close()
+    return response.status_code, len(body)
+
+
+def measure(client, method, path, build_data, requests):
+    """Time ``requests`` calls of one endpoint and trace the peak memory of one.
+
+    The first call is reported separately as it pays for cold caches.
+    """
+    latencies = []
+    statuses = set()
+    size = 0
+    for iteration in range(requests + 1):
+        data = build_data(iteration) if build_data else None
+        started = time.perf_counter()
+        status, size = _request(client, method, path, data)
+        latencies.append((time.perf_counter() - started) * 1000)
+        statuses.add(status)
+    first, samples = latencies[0], sorted(latencies[1:])
+
+    data = build_data(requests + 1) if build_data else None
+    tracemalloc.start()
+    try:
+        _request(client, method, path, data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "status": sorted(statuses),
+        "requests": len(samples),
+        "first_ms": round(first, 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p50_ms": round(_percentile(samples, 0.50), 3),
+        "p90_ms": round(_percentile(samples, 0.90), 3),
+        "p99_ms": round(_percentile(samples, 0.99), 3),
+        "max_ms": round(samples[-1], 3),
+        "peak_kib": round(peak / 1024, 1),
+        "bytes": size,
+    }
+
+
+def run_endpoints(app, requests, only=None):
+    """Benchmark every endpoint (or those named in ``only``) of ``app``."""
+    client = app.test_client()
+    return {
+        name: measure(client, method, path, build_data, requests)
+        for name, method, path, build_data in ENDPOINTS
+        if not only or name in only
+    }
+
+
+def metadata():
+    """Describe the code and machine the results come from."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Yield ``(scale, endpoint, metric, old, new, regressed)`` for shared results.
+
+    A metric regressed when it grew by more than ``threshold`` times.
+    """
+    for scale, result in current["scales"].items():
+        old_endpoints = baseline["scales"].get(scale, {}).get("endpoints", {})
+        for endpoint, metrics in result["endpoints"].items():
+            old = old_endpoints.get(endpoint)
+            if old is None:
+                continue
+            for metric in ("p50_ms", "p99_ms", "peak_kib"):
+                regressed = metrics[metric] > old[metric] * threshold
+                yield scale, endpoint, metric, old[metric], metrics[metric], regressed
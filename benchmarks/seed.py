@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Seed a benchmark database through the test factories."""
+import random
+import time
+
+import factory
+from sqlalchemy import insert
+
+from my_flask_app import search
+from my_flask_app.extensions import bcrypt, db
+from my_flask_app.user.denormalize import sync_feedback_names
+from my_flask_app.user.models import (
+    Course,
+    CourseFeedbackCount,
+    Feedback,
+    Statistics,
+    User,
+)
+from tests.factories import CourseFactory, FeedbackFactory, UserFactory
+
+#: Password of every seeded user.
+PASSWORD = "benchmark"
+CHUNK_SIZE = 10000
+
+
+def _insert_built(model, factory_class, count, extra):
+    """Insert ``count`` rows built by ``factory_class`` in chunked transactions.
+
+    :param extra: Callable returning additional column values for row ``n``.
+    """
+    inserted = 0
+    while inserted < count:
+        size = min(CHUNK_SIZE, count - inserted)
+        rows = factory.build_batch(dict, size, FACTORY_CLASS=factory_class)
+        for offset, row in enumerate(rows):
+            row.update(extra(inserted + offset))
+        db.session.execute(insert(model.__table__), rows)
+        db.session.commit()
+        inserted += size
+
+
+def seed(courses, feedback, description_size=2000, rng=None):
+    """Create ``courses`` courses and ``feedback`` feedback rows with their users.
+
+    Rows are built by the test factories and written with ``executemany``;
+    the statistics and search index are rebuilt once at the end. Returns the
+    seeding time in seconds.
+    """
+    rng = rng or random.Random(0)
+    started = time.perf_counter()
+    db.create_all()
+    description = ("Lorem ipsum dolor sit amet " * (description_size // 27 + 1))[
+        :description_size
+    ]
+    password = bcrypt.generate_password_hash(PASSWORD)
+
+    _insert_built(
+        Course,
+        CourseFactory,
+        courses,
+        lambda n: {"course_description": description, "course_link": None},
+    )
+    # feedback.user_id is unique, so every feedback needs its own user.
+    _insert_built(
+        User,
+        UserFactory,
+        feedback,
+        lambda n: {"password": password, "is_admin": False},
+    )
+    course_ids = db.session.scalars(db.select(Course.id)).all()
+    user_ids = db.session.scalars(db.select(User.id).order_by(User.id)).all()
+    _insert_built(
+        Feedback,
+        FeedbackFactory,
+        feedback,
+        lambda n: {"course_id": rng.choice(course_ids), "user_id": user_ids[n]},
+    )
+
+    # Bulk inserts bypass the mapper hooks; fill what they maintain.
+    connection = db.session.connection()
+    sync_feedback_names(connection)
+    for index in search.indexes.values():
+        index.rebuild(connection)
+    db.session.commit()
+    Statistics.reconcile()
+    CourseFeedbackCount.reconcile()
+    return time.perf_counter() - started
+
+
+def is_seeded(courses, feedback):
+    """Whether the database already holds a dataset of this scale."""
+    db.create_all()
+    stats = Statistics.current()
+    return stats["course_count"] == courses and stats["feedback_count"] == feedback
@@ -0,0 +1,17 @@
+"""Settings module for the benchmark runs."""
+
+import os
+
+ENV = "production"
+TESTING = False
+SQLALCHEMY_DATABASE_URI = "sqlite://"  # Replaced per scale by the runner
+SECRET_KEY = "not-so-secret-in-benchmarks"
+BCRYPT_LOG_ROUNDS = int(os.environ.get("BENCH_BCRYPT_LOG_ROUNDS", 12))
+DEBUG_TB_ENABLED = False
+CACHE_TYPE = "flask_caching.backends.SimpleCache"
+SQLALCHEMY_TRACK_MODIFICATIONS = False
+WTF_CSRF_ENABLED = False  # Allows posting the login and register forms
+PAGE_SIZE_DEFAULT = 100
+PAGE_SIZE_MAX = 1000
+STREAM_BATCH_SIZE = 500
+FEEDBACK_WRITER_ENABLED = False
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Gunicorn configuration, read from the working directory on start-up.
+
+Command line flags still apply, and select the worker class: supervisord
+runs gevent workers (see ``supervisord_programs/gunicorn.conf``), the
+``Procfile`` the default sync ones. Besides the server hooks, this file
+preloads the app when ``GUNICORN_PRELOAD`` is true, as the Docker image sets
+it: the master builds it once and every worker is forked from it, sharing
+its memory copy-on-write. Preloaded code is only reloaded by a restart, not
+by ``HUP``. Preloading monkey-patches the master for gevent, so it must only
+be enabled with ``-k gevent``.
+"""
+import gc
+import os
+import shutil
+import tempfile
+
+# Workers share metric samples through files in this directory; it must be
+# set before they import the app.
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "prometheus")
+)
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "").lower() in ("1", "true", "yes")
+
+if preload_app:
+    # The gevent worker patches after the fork, too late for the modules the
+    # master imports while preloading; patch before anything is imported.
+    from gevent import monkey
+
+    monkey.patch_all()
+
+
+def on_starting(server):
+    """Start every master with empty metric files and an empty shared cache."""
+    from my_flask_app.shared_cache import cache_path, remove_cache_files
+
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    # Responses cached by the previous release may not match the new code.
+    remove_cache_files(cache_path(os.environ.get("CACHE_DIR")))
+
+
+def when_ready(server):
+    """Compile the templates once for all workers, then collect the garbage.
+
+    A preloading master hands the compiled templates to the workers it forks;
+    otherwise each worker loads them from the shared bytecode cache.
+    """
+    if server.cfg.preload_app:
+        from my_flask_app.templating import template_cache
+
+        template_cache.precompile(server.app.wsgi())
+    gc.collect()
+
+
+def pre_fork(server, worker):
+    """Keep the collector off the objects the worker shares with the master.
+
+    Frozen objects are never examined, so collections in the worker do not
+    write to, and copy, the pages they live on.
+    """
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    """Give the worker its own database connections once gevent is set up.
+
+    Feedback spooled before a restart is drained without waiting for the
+    worker's first submission.
+    """
+    from my_flask_app.database import dispose_after_fork
+
+    dispose_after_fork(worker.wsgi)
+    worker.wsgi.extensions["feedback_ingest"].resume()
+
+
+def child_exit(server, worker):
+    """Drop the live samples of a worker that exited."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
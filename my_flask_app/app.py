@@ -1,21 +1,27 @@
 # -*- coding: utf-8 -*-
 """The app module, containing the app factory function."""
-import logging
-import sys
-
 from flask import Flask, render_template
+from flask.logging import default_handler
 
 from my_flask_app import commands, public, user
+from my_flask_app.compression import compress
 from my_flask_app.extensions import (
     bcrypt,
     cache,
     csrf_protect,
     db,
-    debug_toolbar,
     flask_static_digest,
     login_manager,
-    migrate,
 )
+from my_flask_app.hashing import password_hasher
+from my_flask_app.ingest import feedback_ingest
+from my_flask_app.json_provider import FastJSONProvider
+from my_flask_app.logs import AsyncJsonHandler, SamplingFilter
+from my_flask_app.metrics import metrics
+from my_flask_app.replicas import read_replicas
+from my_flask_app.startup import StartupTimer, is_cli
+from my_flask_app.templating import template_cache
+from my_flask_app.user.identity import user_identities
 
 
 def create_app(config_object="my_flask_app.settings"):
@@ -23,30 +29,71 @@ def create_app(config_object="my_flask_app.settings"):
 
     :param config_object: The configuration object to use.
     """
+    timer = StartupTimer()
     app = Flask(__name__.split(".")[0])
-    app.config.from_object(config_object)
-    register_extensions(app)
-    register_blueprints(app)
-    register_errorhandlers(app)
-    register_shellcontext(app)
-    register_commands(app)
-    configure_logger(app)
+    with timer.phase("config"):
+        app.config.from_object(config_object)
+        app.json = FastJSONProvider(app)
+    with timer.phase("extensions"):
+        register_extensions(app)
+    with timer.phase("blueprints"):
+        register_blueprints(app)
+        register_errorhandlers(app)
+        register_shellcontext(app)
+    with timer.phase("commands"):
+        register_commands(app)
+    with timer.phase("logging"):
+        configure_logger(app)
+    timer.stop()
+    app.extensions["startup"] = timer
+    app.logger.info(
+        "Application created in %.1f ms (%s)",
+        timer.total,
+        ", ".join(f"{name} {ms:.1f} ms" for name, ms in timer.phases.items()),
+    )
     return app
 
 
 def register_extensions(app):
     """Register Flask extensions."""
+    # Before anything renders or compiles a template.
+    template_cache.init_app(app)
     bcrypt.init_app(app)
+    password_hasher.init_app(app)
     cache.init_app(app)
+    # Adds the replica binds, so it must run before db.init_app.
+    read_replicas.init_app(app)
     db.init_app(app)
     csrf_protect.init_app(app)
     login_manager.init_app(app)
-    debug_toolbar.init_app(app)
-    migrate.init_app(app, db)
+    user_identities.init_app(app)
+    register_optional_extensions(app)
     flask_static_digest.init_app(app)
+    # Registered before compress so its after_request sees the final body size.
+    metrics.init_app(app)
+    compress.init_app(app)
+    feedback_ingest.init_app(app)
     return None
 
 
+def register_optional_extensions(app):
+    """Register the extensions only some processes use.
+
+    With ``LAZY_EXTENSIONS`` the debug toolbar is imported only when enabled,
+    and Flask-Migrate, which pulls in Alembic, only under the ``flask``
+    command that runs its ``db`` subcommands.
+    """
+    lazy = app.config.get("LAZY_EXTENSIONS", True)
+    if not lazy or app.config.get("DEBUG_TB_ENABLED"):
+        from flask_debugtoolbar import DebugToolbarExtension
+
+        DebugToolbarExtension(app)
+    if not lazy or is_cli():
+        from flask_migrate import Migrate
+
+        Migrate(app, db)
+
+
 def register_blueprints(app):
     """Register Flask blueprints."""
     app.register_blueprint(public.views.blueprint)
@@ -82,10 +129,26 @@ def register_commands(app):
     """Register Click commands."""
     app.cli.add_command(commands.test)
     app.cli.add_command(commands.lint)
+    app.cli.add_command(commands.reconcile_stats)
+    app.cli.add_command(commands.drain_feedback)
+    app.cli.add_command(commands.rebuild_search_index)
+    app.cli.add_command(commands.import_courses)
+    app.cli.add_command(commands.backfill_feedback_names)
+    app.cli.add_command(commands.startup_report)
+    app.cli.add_command(commands.precompile_templates)
 
 
 def configure_logger(app):
     """Configure loggers."""
-    handler = logging.StreamHandler(sys.stdout)
-    if not app.logger.handlers:
-        app.logger.addHandler(handler)
+    app.logger.setLevel(app.config.get("LOG_LEVEL", "INFO").upper())
+    # Apps share one logger; replace what an earlier app set up.
+    for handler in list(app.logger.handlers):
+        if handler is default_handler or isinstance(handler, AsyncJsonHandler):
+            app.logger.removeHandler(handler)
+            handler.close()
+    handler = AsyncJsonHandler(
+        queue_size=app.config.get("LOG_QUEUE_SIZE", 10000),
+        max_length=app.config.get("LOG_MAX_LENGTH", 2000),
+    )
+    handler.addFilter(SamplingFilter(app.config.get("LOG_SAMPLING", {})))
+    app.logger.addHandler(handler)
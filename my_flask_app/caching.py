@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""View caching that is invalidated by database commits or TTLs.
+
+Cached views are protected against stampedes. When an entry is missing, one
+caller, across every worker sharing the cache, recomputes it while the others
+wait for its result. Entries with a TTL are recomputed in the background
+shortly before they expire, and served stale for a while after, so requests
+do not wait on the recompute.
+"""
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from flask import copy_current_request_context, current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .extensions import cache
+from .versioning import TableVersion, versioned_tables
+
+#: Cache keys to drop whenever a commit touches rows of the given table.
+_dependents = defaultdict(set)
+
+#: Seconds a recompute holds its lock; a crashed worker's lock expires then.
+LOCK_TIMEOUT = 30
+
+#: Seconds between two looks at the cache while another caller recomputes.
+POLL_INTERVAL = 0.05
+
+_refresher = None
+_refresher_pid = None
+_refresher_lock = threading.Lock()
+
+
+def _refresh_executor():
+    """Return this process' refresh thread, creating it after start-up or a fork."""
+    global _refresher, _refresher_pid
+    pid = os.getpid()
+    if _refresher is None or _refresher_pid != pid:
+        with _refresher_lock:
+            if _refresher is None or _refresher_pid != pid:
+                _refresher = ThreadPoolExecutor(1, "cache-refresh")
+                _refresher_pid = pid
+    return _refresher
+
+
+class SingleFlight(object):
+    """A cached response recomputed by one caller at a time.
+
+    :param key: Cache key for the response.
+    :param timeout: Seconds the response is fresh; 0 keeps it until invalidated.
+    :param stale: Seconds past ``timeout`` the response is still served while
+        it is recomputed in the background.
+    :param refresh_ahead: Fraction of ``timeout`` before expiry at which the
+        background recompute starts.
+    :param wait: Seconds a caller waits for another's recompute before doing
+        it itself.
+    :param tablenames: Tables the response is built from; a response computed
+        while a commit writes to one of them is not cached.
+    """
+
+    def __init__(
+        self, key, timeout=0, stale=60, refresh_ahead=0.1, wait=5.0, tablenames=()
+    ):
+        """Create instance."""
+        self.key = key
+        self.tablenames = sorted(tablenames)
+        self.lock = f"{key}/lock"
+        self.timeout = timeout
+        self.stale = stale
+        self.refresh_ahead = refresh_ahead
+        self.wait = wait
+
+    def acquire(self):
+        """Take the recompute lock, shared by every worker using the cache."""
+        return cache.add(self.lock, os.getpid(), timeout=LOCK_TIMEOUT)
+
+    def release(self):
+        """Give the recompute lock back."""
+        cache.delete(self.lock)
+
+    def fill(self, view, *args, **kwargs):
+        """Compute the response with ``view`` and cache it.
+
+        Errors and responses marked ``no_store``, such as partial ones, are
+        returned without being cached. Neither is a response whose tables
+        changed while it was computed: the commit's invalidation may already
+        have run, and would not remove it.
+        """
+        versions = self.versions()
+        rv = current_app.make_response(view(*args, **kwargs))
+        if rv.status_code != 200 or rv.cache_control.no_store:
+            return rv
+        if self.timeout:
+            refresh_at = time.time() + self.timeout * (1 - self.refresh_ahead)
+            cache.set(self.key, (rv, refresh_at), timeout=self.timeout + self.stale)
+        else:
+            cache.set(self.key, (rv, None), timeout=0)
+        # Checked after storing: a commit bumps the versions before it
+        # invalidates, so a later commit's invalidation removes the entry.
+        if self.versions() != versions:
+            cache.delete(self.key)
+        return rv
+
+    def versions(self):
+        """Return the current versions of the response's tables."""
+        return TableVersion.current(self.tablenames) if self.tablenames else []
+
+    def refresh(self, view, *args, **kwargs):
+        """Recompute the response in the background, then release the lock."""
+        try:
+            self.fill(view, *args, **kwargs)
+        except Exception:  # noqa: B902
+            current_app.logger.exception("Refreshing cached %s failed", self.key)
+        finally:
+            self.release()
+
+    def wait_for_fill(self):
+        """Wait for the lock holder's response; None if it never comes.
+
+        The cache is read once more after the lock is released, as the
+        response may have been stored since the last poll.
+        """
+        deadline = time.monotonic() + self.wait
+        while time.monotonic() < deadline and cache.has(self.lock):
+            time.sleep(POLL_INTERVAL)
+            entry = cache.get(self.key)
+            if entry is not None:
+                return entry
+        return cache.get(self.key)
+
+    def __call__(self, view):
+        """Decorate ``view``."""
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            entry = cache.get(self.key)
+            if entry is None and not self.acquire():
+                entry = self.wait_for_fill()
+            elif entry is None:
+                try:
+                    return self.fill(view, *args, **kwargs)
+                finally:
+                    self.release()
+            if entry is None:
+                return self.fill(view, *args, **kwargs)
+            rv, refresh_at = entry
+            if refresh_at is not None and time.time() >= refresh_at and self.acquire():
+                _refresh_executor().submit(
+                    copy_current_request_context(self.refresh), view, *args, **kwargs
+                )
+            return rv
+
+        return wrapper
+
+
+def cached_single_flight(key, *models, **options):
+    """Cache a view's response, recomputing it once however many callers miss.
+
+    Usage: ::
+
+        @blueprint.route("/dashboard/piechart")
+        @cached_single_flight("dashboard/piechart", Course, timeout=60)
+        def piechart():
+            ...
+
+    :param key: Cache key for the response.
+    :param models: Model classes whose inserts, updates or deletes invalidate it.
+    :param options: ``timeout``, ``stale``, ``refresh_ahead`` and ``wait``, as
+        taken by :class:`SingleFlight`.
+    """
+    tablenames = [model.__tablename__ for model in models]
+    for tablename in tablenames:
+        _dependents[tablename].add(key)
+    versioned_tables.update(tablenames)
+    return SingleFlight(key, tablenames=tablenames, **options)
+
+
+def cached_until_changed(key, *models):
+    """Cache a view's response until a commit writes to one of ``models``.
+
+    Usage: ::
+
+        @blueprint.route("/dashboard/summary")
+        @cached_until_changed("dashboard/summary", Course, Feedback, User)
+        def summary():
+            ...
+
+    :param key: Cache key for the response.
+    :param models: Model classes whose inserts, updates or deletes invalidate it.
+    """
+    return cached_single_flight(key, *models)
+
+
+def invalidate_tables(*tablenames):
+    """Drop every cached response depending on ``tablenames``."""
+    keys = set().union(*(_dependents.get(name, ()) for name in tablenames))
+    if keys:
+        cache.delete_many(*keys)
+
+
+def mark_changed(session, *tablenames):
+    """Record that the current transaction of ``session`` writes ``tablenames``.
+
+    Bumps their content versions in the same transaction and invalidates the
+    dependent cached responses once it commits. Flushes are tracked
+    automatically; call this after ORM bulk statements or raw SQL, which
+    bypass the flush events.
+    """
+    if not tablenames:
+        return
+    TableVersion.bump(session.connection(), tablenames)
+    session.info.setdefault("changed_tables", set()).update(tablenames)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_tables(session, flush_context):
+    """Remember which tables a flush wrote to until the transaction ends."""
+    changed = {
+        instance.__table__.name
+        for instance in session.dirty
+        if session.is_modified(instance)
+    }
+    changed.update(instance.__table__.name for instance in session.new)
+    changed.update(instance.__table__.name for instance in session.deleted)
+    mark_changed(session, *changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_tables(session):
+    """Invalidate cached responses once the written rows are visible."""
+    changed = session.info.pop("changed_tables", None)
+    if changed:
+        invalidate_tables(*changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_tables(session):
+    """Rolled back writes leave the cache untouched."""
+    session.info.pop("changed_tables", None)
@@ -1,10 +1,21 @@
 # -*- coding: utf-8 -*-
 """Click commands."""
 import os
+import time
 from glob import glob
 from subprocess import call
 
 import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from my_flask_app import importer, search, startup
+from my_flask_app.caching import mark_changed
+from my_flask_app.extensions import db
+from my_flask_app.ingest import feedback_ingest
+from my_flask_app.templating import template_cache
+from my_flask_app.user.denormalize import sync_feedback_names
+from my_flask_app.user.models import Course, CourseFeedbackCount, Feedback, Statistics
 
 HERE = os.path.abspath(os.path.dirname(__file__))
 PROJECT_ROOT = os.path.join(HERE, os.pardir)
@@ -81,3 +92,148 @@ def lint(fix_imports, check):
         execute_tool("Fixing import order", "isort", *isort_args)
     execute_tool("Formatting style", "black", *black_args)
     execute_tool("Checking code style", "flake8")
+
+
+@click.command("reconcile-stats")
+@with_appcontext
+def reconcile_stats():
+    """Recount rows and rewrite the dashboard statistics."""
+    stats = Statistics.reconcile()
+    CourseFeedbackCount.reconcile()
+    click.echo(
+        f"courses={stats.course_count} feedback={stats.feedback_count} "
+        f"users={stats.user_count}"
+    )
+
+
+@click.command("drain-feedback")
+@with_appcontext
+def drain_feedback():
+    """Commit spooled feedback, replaying anything left by a crash."""
+    inserted = feedback_ingest.drain()
+    click.echo(f"Inserted {inserted} feedback rows")
+
+
+@click.command("rebuild-search-index")
+@with_appcontext
+def rebuild_search_index():
+    """Repopulate the full-text search indexes from the base tables."""
+    connection = db.session.connection()
+    for kind, index in search.indexes.items():
+        click.echo(f"Indexed {index.rebuild(connection)} {kind} rows")
+    db.session.commit()
+
+
+@click.command("import-courses")
+@click.argument("source", type=click.File("r", encoding="utf-8"))
+@click.option(
+    "-f",
+    "--format",
+    "fmt",
+    type=click.Choice(["csv", "json", "ndjson"]),
+    default=None,
+    help="Input format, guessed from the file extension by default",
+)
+@click.option(
+    "-b",
+    "--batch-size",
+    default=5000,
+    show_default=True,
+    help="Rows per executemany batch and transaction",
+)
+@with_appcontext
+def import_courses(source, fmt, batch_size):
+    """Upsert courses from a CSV, JSON array or NDJSON file keyed on course_code."""
+    if fmt is None:
+        extension = os.path.splitext(source.name)[1].lstrip(".").lower()
+        fmt = {"jsonl": "ndjson"}.get(extension, extension)
+        if fmt not in ("csv", "json", "ndjson"):
+            raise click.UsageError("Cannot guess the input format, pass --format")
+
+    started = time.perf_counter()
+    imported = skipped = 0
+    records = importer.iter_records(source, fmt)
+    for index, batch in enumerate(importer.batched(records, batch_size)):
+        rows = []
+        for number, record in enumerate(batch, start=index * batch_size + 1):
+            try:
+                rows.append(importer.validate_course(record))
+            except importer.InvalidRecord as error:
+                skipped += 1
+                click.echo(f"Skipping record {number}: {error}", err=True)
+        if rows:
+            connection = db.session.connection()
+            importer.upsert_courses(connection, rows)
+            mark_changed(db.session, "course")
+            codes = [row["course_code"] for row in rows]
+            renamed = db.select(Course.id).where(Course.course_code.in_(codes))
+            if sync_feedback_names(connection, Feedback.course_id.in_(renamed)):
+                mark_changed(db.session, "feedback")
+            db.session.commit()
+        imported += len(rows)
+        elapsed = time.perf_counter() - started
+        click.echo(f"{imported} courses imported ({imported / elapsed:,.0f} rows/s)")
+
+    # executemany bypasses the mapper hooks, so refresh what they maintain.
+    search.indexes["course"].rebuild(db.session.connection())
+    Statistics.reconcile()
+    elapsed = time.perf_counter() - started
+    click.echo(
+        f"Imported {imported} courses, skipped {skipped} invalid records "
+        f"in {elapsed:.2f}s ({imported / max(elapsed, 1e-9):,.0f} rows/s)"
+    )
+
+
+@click.command("backfill-feedback-names")
+@click.option(
+    "-b",
+    "--batch-size",
+    default=5000,
+    show_default=True,
+    help="Feedback ids per transaction",
+)
+@with_appcontext
+def backfill_feedback_names(batch_size):
+    """Copy course names and usernames into existing feedback rows."""
+    last_id = db.session.scalar(db.select(db.func.max(Feedback.id))) or 0
+    updated = 0
+    for start in range(0, last_id, batch_size):
+        in_batch = Feedback.id.between(start + 1, start + batch_size)
+        count = sync_feedback_names(db.session.connection(), in_batch)
+        if count:
+            mark_changed(db.session, "feedback")
+        db.session.commit()
+        updated += count
+        click.echo(f"{min(start + batch_size, last_id)}/{last_id} rows checked")
+    click.echo(f"Updated {updated} feedback rows")
+
+
+@click.command("startup-report")
+@click.option(
+    "-n",
+    "--limit",
+    default=20,
+    show_default=True,
+    help="Slowest imports to list",
+)
+def startup_report(limit):
+    """Time the app factory phases and the slowest imports of a cold start."""
+    for line in current_app.extensions["startup"].report():
+        click.echo(line)
+    click.echo("Slowest imports of a cold start (self / cumulative ms):")
+    for module, own, cumulative in startup.import_times(limit=limit):
+        click.echo(f"  {own:8.1f} {cumulative:8.1f}  {module}")
+
+
+@click.command("precompile-templates")
+@with_appcontext
+def precompile_templates():
+    """Compile every template into the shared bytecode cache."""
+    if current_app.jinja_env.bytecode_cache is None:
+        raise click.ClickException("The template cache is disabled")
+    compiled, failed = template_cache.precompile(current_app)
+    for name, error in failed:
+        click.echo(f"Failed to compile {name}: {error}", err=True)
+    click.echo(f"Compiled {compiled} templates")
+    if failed:
+        raise SystemExit(1)
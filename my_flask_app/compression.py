@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Negotiated gzip/brotli compression of dynamic responses.
+
+Static assets are precompressed by ``flask_static_digest``; this covers the
+JSON produced by views. Bodies carrying an ``ETag`` (see
+:func:`my_flask_app.versioning.conditional`) identify a content version, so
+their compressed form is kept in ``extensions.cache`` and reused until the
+data changes. Streamed bodies are compressed on the fly, flushing after every
+chunk so the first rows still reach the client immediately.
+"""
+import gzip
+import zlib
+
+from flask import request
+
+from .extensions import cache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+def _compress_stream(chunks, encoding, level):
+    """Compress an iterable of byte chunks, flushing after each one."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=min(level, 11))
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class Compress(object):
+    """Flask extension compressing responses in ``after_request``."""
+
+    def init_app(self, app):
+        """Register the response hook and configuration defaults."""
+        app.config.setdefault(
+            "COMPRESS_MIMETYPES", ["application/json", "application/x-ndjson"]
+        )
+        app.config.setdefault("COMPRESS_MIN_SIZE", 1024)
+        app.config.setdefault("COMPRESS_LEVEL", 6)
+        app.config.setdefault("COMPRESS_CACHE_TIMEOUT", 3600)
+        self.app = app
+        app.after_request(self.after_request)
+
+    def encodings(self):
+        """Encodings this server can produce, most preferred first."""
+        return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+    def compress(self, data, encoding):
+        """Compress ``data`` with ``encoding`` at the configured level."""
+        level = self.app.config["COMPRESS_LEVEL"]
+        if encoding == "br":
+            return brotli.compress(data, quality=min(level, 11))
+        return gzip.compress(data, compresslevel=level, mtime=0)
+
+    def _is_compressible(self, response):
+        if response.status_code != 200 or request.method != "GET":
+            return False
+        if response.direct_passthrough or "Content-Encoding" in response.headers:
+            return False
+        return response.mimetype in self.app.config["COMPRESS_MIMETYPES"]
+
+    def after_request(self, response):
+        """Compress ``response`` with the client's preferred supported encoding."""
+        if not self._is_compressible(response):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = request.accept_encodings.best_match(self.encodings())
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = _compress_stream(
+                response.iter_encoded(), encoding, self.app.config["COMPRESS_LEVEL"]
+            )
+            response.headers.pop("Content-Length", None)
+            response.headers["Content-Encoding"] = encoding
+            return response
+
+        data = response.get_data()
+        if len(data) < self.app.config["COMPRESS_MIN_SIZE"]:
+            return response
+        etag, _ = response.get_etag()
+        key = f"compressed/{encoding}/{etag}" if etag else None
+        compressed = cache.get(key) if key else None
+        if compressed is None:
+            compressed = self.compress(data, encoding)
+            if key:
+                cache.set(
+                    key, compressed, timeout=self.app.config["COMPRESS_CACHE_TIMEOUT"]
+                )
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+
+compress = Compress()
@@ -2,6 +2,8 @@
 """Database module, including the SQLAlchemy database object and DB-related utilities."""
 from typing import Optional, Type, TypeVar
 
+from sqlalchemy import inspect
+
 from .compat import basestring
 from .extensions import db
 
@@ -49,6 +51,44 @@ class Model(CRUDMixin, db.Model):
 
     __abstract__ = True
 
+    #: Named field sets, mapping a name such as ``"list"`` to attribute names.
+    #: ``"detail"`` defaults to every public column.
+    __fields__ = {}
+
+    @classmethod
+    def field_names(cls, fields="detail"):
+        """Attribute names of the field set ``fields``.
+
+        :raises KeyError: if the model defines no such field set.
+        """
+        if fields in cls.__fields__:
+            return tuple(cls.__fields__[fields])
+        if fields != "detail":
+            raise KeyError(f"{cls.__name__} has no field set {fields!r}")
+        return tuple(
+            attr.key
+            for attr in inspect(cls).column_attrs
+            if not attr.key.startswith("_")
+        )
+
+    @classmethod
+    def select_fields(cls, fields="detail"):
+        """Select the columns of the field set ``fields``, labelled by attribute name.
+
+        Executing the statement returns plain rows, which skips building and
+        tracking ORM instances; rows serialize as objects through ``app.json``.
+        """
+        return db.select(*cls.field_columns(fields))
+
+    @classmethod
+    def field_columns(cls, fields="detail"):
+        """Columns of the field set ``fields``, labelled by attribute name."""
+        return [getattr(cls, name).label(name) for name in cls.field_names(fields)]
+
+    def to_dict(self, fields="detail"):
+        """Convert the record to a dictionary of the field set ``fields``."""
+        return {name: getattr(self, name) for name in self.field_names(fields)}
+
 
 class PkModel(Model):
     """Base model class that includes CRUD convenience methods, plus adds a 'primary key' column named ``id``."""
@@ -78,6 +118,33 @@ class PkModel(Model):
 
         return cls.query.all()
 
+    @classmethod
+    def paginate_after(cls, after=None, limit=100, query=None, fields=None):
+        """Keyset-paginate records in primary key order.
+
+        :param after: Cursor returned by the previous page; only records with a
+            greater ``id`` are returned.
+        :param limit: Maximum number of records in the page.
+        :param query: Base query to paginate, defaults to ``cls.query``.
+        :param fields: Name of a field set; when given, rows of its columns
+            (see :meth:`select_fields`) are returned instead of instances,
+            with the filters of ``query`` still applied.
+        :returns: A ``(records, next_cursor)`` tuple, ``next_cursor`` is ``None``
+            on the last page.
+        """
+        if query is None:
+            query = cls.query
+        if fields is not None:
+            query = query.with_entities(*cls.field_columns(fields))
+        if after is not None:
+            query = query.filter(cls.id > after)
+        # Fetch one extra row to know whether another page follows.
+        records = query.order_by(cls.id).limit(limit + 1).all()
+        next_cursor = None
+        if len(records) > limit:
+            records = records[:limit]
+            next_cursor = records[-1].id
+        return records, next_cursor
 
 
 def reference_col(
@@ -98,3 +165,14 @@ def reference_col(
         nullable=nullable,
         **column_kwargs,
     )
+
+
+def dispose_after_fork(app):
+    """Drop the pooled connections a forked worker inherited from its parent.
+
+    They are discarded without being closed, as the parent may still use them;
+    the worker opens its own on first use.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
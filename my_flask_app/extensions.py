@@ -1,19 +1,21 @@
 # -*- coding: utf-8 -*-
-"""Extensions module. Each extension is initialized in the app factory located in app.py."""
+"""Extensions module. Each extension is initialized in the app factory located in app.py.
+
+Flask-DebugToolbar and Flask-Migrate are not here: the factory imports them
+only in the processes that use them.
+"""
 from flask_bcrypt import Bcrypt
 from flask_caching import Cache
-from flask_debugtoolbar import DebugToolbarExtension
 from flask_login import LoginManager
-from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 from flask_static_digest import FlaskStaticDigest
 from flask_wtf.csrf import CSRFProtect
 
+from .replicas import RoutingSession
+
 bcrypt = Bcrypt()
 csrf_protect = CSRFProtect()
 login_manager = LoginManager()
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 cache = Cache()
-debug_toolbar = DebugToolbarExtension()
 flask_static_digest = FlaskStaticDigest()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""Password hashing off the request thread or greenlet.
+
+bcrypt is deliberately slow CPU work. Run inline under ``gunicorn -k gevent``
+it blocks the whole hub, stalling every other request of the worker. The
+:class:`PasswordHasher` runs it on a bounded pool of OS threads instead (the
+bcrypt C code releases the GIL) and rejects callers once too many hashes are
+queued, so a login storm degrades into fast "try again" answers.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .extensions import bcrypt
+
+try:
+    from gevent import monkey as gevent_monkey
+    from gevent.threadpool import ThreadPool as GeventThreadPool
+except ImportError:  # pragma: no cover
+    gevent_monkey = None
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when the hashing queue is full."""
+
+
+class PasswordHasher(object):
+    """Bounded executor for ``flask_bcrypt`` hashing and verification."""
+
+    def __init__(self):
+        """Create instance."""
+        self.pool_size = 1
+        self.queue_limit = 0
+        self._pool = None
+        self._pool_pid = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read ``BCRYPT_POOL_SIZE`` and ``BCRYPT_QUEUE_LIMIT`` from ``app``."""
+        self.pool_size = app.config.get("BCRYPT_POOL_SIZE") or os.cpu_count() or 1
+        self.queue_limit = app.config.get("BCRYPT_QUEUE_LIMIT", 16)
+        self.close()
+
+    def close(self):
+        """Stop this process' pool; the next hash starts a new one."""
+        if self._pool is not None and self._pool_pid == os.getpid():
+            if isinstance(self._pool, ThreadPoolExecutor):
+                self._pool.shutdown(wait=False)
+            else:
+                self._pool.kill()
+        self._pool = None
+
+    def _executor(self):
+        """Return this process' pool, creating it after start-up or a fork."""
+        pid = os.getpid()
+        if self._pool is None or self._pool_pid != pid:
+            with self._lock:
+                if self._pool is None or self._pool_pid != pid:
+                    if gevent_monkey and gevent_monkey.is_module_patched("threading"):
+                        self._pool = GeventThreadPool(self.pool_size)
+                    else:
+                        self._pool = ThreadPoolExecutor(
+                            self.pool_size, thread_name_prefix="bcrypt"
+                        )
+                    self._slots = threading.BoundedSemaphore(
+                        self.pool_size + self.queue_limit
+                    )
+                    self._pool_pid = pid
+        return self._pool
+
+    def _call(self, func, *args):
+        """Run ``func`` on the pool, waiting cooperatively for the result."""
+        pool = self._executor()
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy("Too many password hashes in progress")
+        try:
+            if isinstance(pool, ThreadPoolExecutor):
+                return pool.submit(func, *args).result()
+            return pool.spawn(func, *args).get()
+        finally:
+            self._slots.release()
+
+    def generate_password_hash(self, password):
+        """Hash ``password`` with the configured bcrypt rounds."""
+        return self._call(bcrypt.generate_password_hash, password)
+
+    def check_password_hash(self, pw_hash, password):
+        """Check ``password`` against ``pw_hash`` in constant time."""
+        return self._call(bcrypt.check_password_hash, pw_hash, password)
+
+
+password_hasher = PasswordHasher()
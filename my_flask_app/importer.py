@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""Bulk loading of the course catalog from CSV or JSON files."""
+import csv
+import json
+from itertools import islice
+
+from sqlalchemy import bindparam, select
+
+from .user.models import Course
+
+COURSE_FIELDS = (
+    "course_name",
+    "course_code",
+    "semester",
+    "course_description",
+    "course_link",
+)
+REQUIRED_FIELDS = ("course_name", "course_code", "semester")
+_CHUNK_SIZE = 64 * 1024
+
+
+class InvalidRecord(ValueError):
+    """A catalog record that cannot be imported."""
+
+
+def _iter_json_array(fileobj):
+    """Decode the objects of a top-level JSON array without loading it whole.
+
+    Nothing past a malformed element can be told apart, so it ends the array
+    as an :class:`InvalidRecord` in place of a record.
+    """
+    decoder = json.JSONDecoder()
+    buffer = fileobj.read(_CHUNK_SIZE).lstrip()
+    if not buffer.startswith("["):
+        raise InvalidRecord("JSON input must be an array of objects")
+    position = 1
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if buffer.startswith("]", position):
+            return
+        try:
+            record, position = decoder.raw_decode(buffer, position)
+        except ValueError as error:
+            # The next object is incomplete; read more input and retry.
+            chunk = fileobj.read(_CHUNK_SIZE)
+            if not chunk:
+                yield InvalidRecord(f"malformed or truncated JSON input: {error}")
+                return
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield record
+
+
+def _iter_json_lines(fileobj):
+    """Decode one object per non-blank line, a malformed line as an :class:`InvalidRecord`."""
+    for number, line in enumerate(fileobj, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as error:
+            yield InvalidRecord(f"line {number} is not valid JSON: {error}")
+
+
+def iter_records(fileobj, fmt):
+    """Stream raw records from ``fileobj``.
+
+    Input that cannot be decoded into a record comes out as an
+    :class:`InvalidRecord`, which :func:`validate_course` raises.
+
+    :param fmt: One of ``csv``, ``json`` (an array) or ``ndjson``.
+    """
+    if fmt == "csv":
+        return csv.DictReader(fileobj)
+    if fmt == "json":
+        return _iter_json_array(fileobj)
+    return _iter_json_lines(fileobj)
+
+
+def validate_course(record):
+    """Return a clean course row from ``record`` or raise :class:`InvalidRecord`."""
+    if isinstance(record, InvalidRecord):
+        raise record
+    if not isinstance(record, dict):
+        raise InvalidRecord("record is not an object")
+    row = {}
+    for field in COURSE_FIELDS:
+        value = record.get(field)
+        if value is not None and not isinstance(value, str):
+            value = str(value)
+        value = value.strip() if value else None
+        if field in REQUIRED_FIELDS and not value:
+            raise InvalidRecord(f"{field} is required")
+        max_length = Course.__table__.c[field].type.length
+        if value and len(value) > max_length:
+            raise InvalidRecord(f"{field} is longer than {max_length} characters")
+        row[field] = value
+    return row
+
+
+def upsert_courses(connection, rows):
+    """Insert ``rows`` or update the courses sharing their ``course_code``.
+
+    Uses a single ``INSERT ... ON CONFLICT`` executemany where the dialect
+    supports it, and one lookup plus two executemany statements otherwise.
+    """
+    # A statement may only touch each course once; the last record wins.
+    rows = list({row["course_code"]: row for row in rows}.values())
+    table = Course.__table__
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        # Imported here; web workers never load the unused dialect.
+        from sqlalchemy.dialects import postgresql, sqlite
+
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.course_code],
+            set_={
+                field: statement.excluded[field]
+                for field in COURSE_FIELDS
+                if field != "course_code"
+            },
+        )
+        connection.execute(statement, rows)
+        return
+    codes = {row["course_code"] for row in rows}
+    existing = set(
+        connection.scalars(
+            select(table.c.course_code).where(table.c.course_code.in_(codes))
+        )
+    )
+    new_rows = [row for row in rows if row["course_code"] not in existing]
+    if new_rows:
+        connection.execute(table.insert(), new_rows)
+    updates = [
+        dict(row, code_key=row["course_code"])
+        for row in rows
+        if row["course_code"] in existing
+    ]
+    if updates:
+        connection.execute(
+            table.update()
+            .where(table.c.course_code == bindparam("code_key"))
+            .values({field: bindparam(field) for field in COURSE_FIELDS}),
+            updates,
+        )
+
+
+def batched(iterable, size):
+    """Yield lists of up to ``size`` items from ``iterable``."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""Durable, group-committed ingestion of feedback submissions.
+
+Submissions are appended to a local spool file and acknowledged as soon as
+they are on disk. A writer drains the spool in batches, each batch being one
+multi-row INSERT committed together with the spool checkpoint, so a crash at
+any point replays exactly the lines that were not committed yet.
+
+Spool layout, in ``FEEDBACK_SPOOL_DIR``:
+
+* ``active.spool`` receives appends from every worker process.
+* ``<time_ns>.segment`` files are rotated out of ``active.spool`` by the
+  writer and deleted once fully committed.
+* ``append.lock`` and ``drain.lock`` coordinate processes via ``flock``.
+* ``<segment>.<offset>.quarantine`` files hold batches set aside after
+  failing ``FEEDBACK_MAX_ATTEMPTS`` times in a row; appending one to
+  ``active.spool`` retries it.
+"""
+import fcntl
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from itertools import islice
+
+from flask import current_app
+from sqlalchemy import insert, select
+
+from . import search
+from .caching import mark_changed
+from .database import Column, Model, db
+from .user.models import Course, CourseFeedbackCount, Feedback, Statistics, User
+
+ACTIVE_NAME = "active.spool"
+SEGMENT_SUFFIX = ".segment"
+QUARANTINE_SUFFIX = ".quarantine"
+
+
+class SpoolCheckpoint(Model):
+    """How far a spool has been committed to the database."""
+
+    __tablename__ = "spool_checkpoints"
+    spool = Column(db.String(80), primary_key=True)
+    segment = Column(db.String(80), nullable=False)
+    offset = Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        """Represent instance as a unique string."""
+        return f"<SpoolCheckpoint({self.spool!r}, {self.segment!r}, {self.offset})>"
+
+
+@contextmanager
+def _flock(path, operation):
+    """Hold an ``flock`` on ``path`` for the duration of the block."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, operation)
+        yield
+    finally:
+        os.close(fd)
+
+
+def _end_of_last_line(fd, size, chunk_size=4096):
+    """Return the offset just past the last newline of ``fd``, 0 if it has none."""
+    end = size
+    while end > 0:
+        start = max(0, end - chunk_size)
+        newline = os.pread(fd, end - start, start).rfind(b"\n")
+        if newline != -1:
+            return start + newline + 1
+        end = start
+    return 0
+
+
+class FeedbackSpool(object):
+    """The spool and its background writer for one application."""
+
+    name = "feedback"
+
+    def __init__(self, app):
+        """Create instance."""
+        self.app = app
+        self.directory = app.config.get("FEEDBACK_SPOOL_DIR") or os.path.join(
+            app.instance_path, "feedback-spool"
+        )
+        self.batch_size = app.config["FEEDBACK_BATCH_SIZE"]
+        self.flush_interval = app.config["FEEDBACK_FLUSH_INTERVAL"]
+        self.fsync = app.config["FEEDBACK_SPOOL_FSYNC"]
+        self.writer_enabled = app.config["FEEDBACK_WRITER_ENABLED"]
+        self.max_attempts = app.config["FEEDBACK_MAX_ATTEMPTS"]
+        self._pending = 0
+        self._attempts = Counter()
+        self._wakeup = threading.Event()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def append(self, record):
+        """Durably append one submission to the spool."""
+        line = json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+        os.makedirs(self.directory, exist_ok=True)
+        # Shared lock: appends run concurrently, rotation waits for them.
+        with _flock(self._path("append.lock"), fcntl.LOCK_SH):
+            written = self._write(line)
+        if not written:
+            # Exclusive lock: with no append in flight, the tail is really torn.
+            with _flock(self._path("append.lock"), fcntl.LOCK_EX):
+                self._write(line, repair=True)
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self._wakeup.set()
+        self.start_writer()
+
+    def _write(self, line, repair=False):
+        """Append ``line`` to the active spool.
+
+        An active spool not ending with a newline has a line torn by a crash
+        mid-append, which ``line`` must not be glued to: with ``repair`` the
+        torn line is truncated away first, otherwise nothing is written.
+
+        :returns: Whether ``line`` was written.
+        """
+        fd = os.open(
+            self._path(ACTIVE_NAME), os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644
+        )
+        try:
+            size = os.fstat(fd).st_size
+            if size and os.pread(fd, 1, size - 1) != b"\n":
+                if not repair:
+                    return False
+                end = _end_of_last_line(fd, size)
+                self.app.logger.warning("Truncating torn spool line at %d", end)
+                os.ftruncate(fd, end)
+            os.write(fd, line)
+            if self.fsync:
+                os.fsync(fd)
+            return True
+        finally:
+            os.close(fd)
+
+    def has_backlog(self):
+        """Whether the spool holds submissions that are not committed yet."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return False
+        return any(name.endswith(SEGMENT_SUFFIX) for name in names) or (
+            ACTIVE_NAME in names and os.path.getsize(self._path(ACTIVE_NAME)) > 0
+        )
+
+    def resume(self):
+        """Start the writer if a previous process left submissions behind."""
+        if self.has_backlog():
+            self.start_writer()
+
+    def _rotate(self):
+        """Move the active spool aside so it can be drained without new appends."""
+        active = self._path(ACTIVE_NAME)
+        with _flock(self._path("append.lock"), fcntl.LOCK_EX):
+            if os.path.exists(active) and os.path.getsize(active):
+                os.rename(active, self._path(f"{time.time_ns():020d}{SEGMENT_SUFFIX}"))
+        self._pending = 0
+
+    def drain(self):
+        """Commit everything spooled so far; return the number of rows inserted.
+
+        Only one process drains at a time; others return 0 immediately.
+        """
+        if not os.path.isdir(self.directory):
+            return 0
+        lock_fd = os.open(self._path("drain.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+            self._rotate()
+            segments = sorted(
+                name
+                for name in os.listdir(self.directory)
+                if name.endswith(SEGMENT_SUFFIX)
+            )
+            return sum(self._drain_segment(segment) for segment in segments)
+        finally:
+            os.close(lock_fd)
+
+    def _drain_segment(self, segment):
+        """Replay one segment from its checkpoint, then delete it.
+
+        A batch that failed to commit ``max_attempts`` times in a row is
+        quarantined instead, so it cannot hold up the rest of the spool.
+        """
+        checkpoint = db.session.get(SpoolCheckpoint, self.name)
+        if checkpoint is None:
+            checkpoint = SpoolCheckpoint(spool=self.name, segment=segment, offset=0)
+        elif checkpoint.segment != segment:
+            checkpoint.segment, checkpoint.offset = segment, 0
+        inserted = 0
+        with open(self._path(segment), "rb") as spool_file:
+            spool_file.seek(checkpoint.offset)
+            while True:
+                lines = list(islice(spool_file, self.batch_size))
+                if not lines:
+                    break
+                batch = (segment, checkpoint.offset)
+                checkpoint.offset += sum(len(line) for line in lines)
+                if self._attempts[batch] >= self.max_attempts:
+                    self._quarantine(batch, lines, checkpoint)
+                    continue
+                try:
+                    inserted += self._commit_batch(lines, checkpoint)
+                except Exception:  # noqa: B902
+                    self._attempts[batch] += 1
+                    raise
+                self._attempts.pop(batch, None)
+        os.remove(self._path(segment))
+        return inserted
+
+    def _commit_batch(self, lines, checkpoint):
+        """Insert one batch and advance the checkpoint in a single transaction."""
+        records = []
+        for line in lines:
+            # A line without its newline was torn by a crash mid-append.
+            if not line.endswith(b"\n"):
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                current_app.logger.warning("Skipping corrupt spool line %r", line)
+        rows = self._resolve(records)
+        if rows:
+            ids = db.session.scalars(
+                insert(Feedback).returning(Feedback.id, sort_by_parameter_order=True),
+                rows,
+            )
+            for row, feedback_id in zip(rows, ids):
+                row["id"] = feedback_id
+            # Bulk inserts bypass mapper and flush events; account for them here.
+            connection = db.session.connection()
+            Statistics.bump(connection, "feedback_count", len(rows))
+            CourseFeedbackCount.bump(connection, Counter(r["course_id"] for r in rows))
+            search.indexes["feedback"].add(connection, rows)
+            mark_changed(db.session, Feedback.__tablename__)
+        db.session.add(checkpoint)
+        db.session.commit()
+        return len(rows)
+
+    def _quarantine(self, batch, lines, checkpoint):
+        """Move the ``lines`` of ``batch`` to a quarantine file and skip them."""
+        segment, offset = batch
+        path = self._path(f"{segment}.{offset}{QUARANTINE_SUFFIX}")
+        with open(path, "wb") as quarantine_file:
+            quarantine_file.writelines(lines)
+            quarantine_file.flush()
+            os.fsync(quarantine_file.fileno())
+        db.session.add(checkpoint)
+        db.session.commit()
+        del self._attempts[batch]
+        current_app.logger.error(
+            "Quarantined feedback batch failing %d times to %s", self.max_attempts, path
+        )
+
+    def _resolve(self, records):
+        """Turn submitted names into feedback rows, dropping unknown or duplicate ones."""
+        courses = dict(
+            db.session.execute(
+                select(Course.course_name, Course.id).where(
+                    Course.course_name.in_({r["course_name"] for r in records})
+                )
+            ).all()
+        )
+        users = dict(
+            db.session.execute(
+                select(User.username, User.id).where(
+                    User.username.in_({r["username"] for r in records})
+                )
+            ).all()
+        )
+        # ``feedback.user_id`` is unique: one feedback per user.
+        taken = set(
+            db.session.scalars(
+                select(Feedback.user_id).where(Feedback.user_id.in_(users.values()))
+            )
+        )
+        rows = []
+        for record in records:
+            course_id = courses.get(record["course_name"])
+            user_id = users.get(record["username"])
+            if course_id is None or user_id is None or user_id in taken:
+                current_app.logger.warning("Dropping feedback submission %r", record)
+                continue
+            taken.add(user_id)
+            rows.append(
+                {
+                    "course_id": course_id,
+                    "user_id": user_id,
+                    "feedback": record["feedback"],
+                    "course_name": record["course_name"],
+                    "username": record["username"],
+                }
+            )
+        return rows
+
+    def start_writer(self):
+        """Start the background writer thread once per process."""
+        if not self.writer_enabled or self._writer is not None:
+            return
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._run, name="feedback-writer", daemon=True
+                )
+                self._writer.start()
+
+    def _run(self):
+        """Drain on every flush interval, or sooner once a batch is pending."""
+        with self.app.app_context():
+            while True:
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                try:
+                    self.drain()
+                except Exception:  # noqa: B902
+                    db.session.rollback()
+                    self.app.logger.exception("Draining the feedback spool failed")
+                finally:
+                    db.session.remove()
+
+
+class FeedbackIngest(object):
+    """Flask extension holding one :class:`FeedbackSpool` per application."""
+
+    def init_app(self, app):
+        """Initialize the extension for ``app``."""
+        app.config.setdefault("FEEDBACK_SPOOL_DIR", None)
+        app.config.setdefault("FEEDBACK_BATCH_SIZE", 500)
+        app.config.setdefault("FEEDBACK_FLUSH_INTERVAL", 0.5)
+        app.config.setdefault("FEEDBACK_SPOOL_FSYNC", True)
+        app.config.setdefault("FEEDBACK_WRITER_ENABLED", True)
+        app.config.setdefault("FEEDBACK_MAX_ATTEMPTS", 5)
+        app.extensions["feedback_ingest"] = FeedbackSpool(app)
+
+    @property
+    def spool(self):
+        """The spool of the current application."""
+        return current_app.extensions["feedback_ingest"]
+
+    def submit(self, record):
+        """Spool a validated submission for the writer."""
+        self.spool.append(record)
+
+    def drain(self):
+        """Synchronously commit everything spooled so far."""
+        return self.spool.drain()
+
+
+feedback_ingest = FeedbackIngest()
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""Structured logging that never waits on stdout.
+
+Records are sampled, reduced to small dicts and truncated on the calling
+thread or greenlet, then appended to a bounded deque. A native OS thread
+encodes them as JSON lines and writes them in batches, so a slow pipe to
+supervisord backs up the deque instead of the requests; once the deque is
+full, new records are dropped and the loss is reported in the log itself.
+"""
+import collections
+import json
+import logging
+import os
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+from flask import has_request_context, request
+
+try:
+    from gevent import monkey as gevent_monkey
+except ImportError:  # pragma: no cover
+    gevent_monkey = None
+
+if gevent_monkey is not None:
+    # The writer must be a real thread even when the worker is monkey patched.
+    _start_new_thread = gevent_monkey.get_original("_thread", "start_new_thread")
+    _allocate_lock = gevent_monkey.get_original("_thread", "allocate_lock")
+    _sleep = gevent_monkey.get_original("time", "sleep")
+else:  # pragma: no cover
+    from _thread import allocate_lock as _allocate_lock
+    from _thread import start_new_thread as _start_new_thread
+    from time import sleep as _sleep
+
+#: Attributes every ``LogRecord`` has; anything else came in through ``extra``.
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message",
+    "asctime",
+}
+
+
+def truncate(text, limit, keep_end=False):
+    """Cut ``text`` to ``limit`` characters, noting how much was left out."""
+    if len(text) <= limit:
+        return text
+    omitted = f"[{len(text) - limit} characters truncated]"
+    if keep_end:
+        return f"{omitted}...{text[-limit:]}"
+    return f"{text[:limit]}...{omitted}"
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of the records below ``WARNING`` of some loggers.
+
+    :param rates: Maps logger names to the fraction of their records to keep;
+        the longest matching name applies, and unlisted loggers keep everything.
+    """
+
+    def __init__(self, rates):
+        """Create instance."""
+        super().__init__()
+        self.rates = dict(rates)
+        self._resolved = {}
+
+    def rate(self, name):
+        """Fraction of records of logger ``name`` to keep."""
+        if name not in self._resolved:
+            rate, parent = 1.0, name
+            while parent:
+                if parent in self.rates:
+                    rate = self.rates[parent]
+                    break
+                parent = parent.rpartition(".")[0]
+            self._resolved[name] = rate
+        return self._resolved[name]
+
+    def filter(self, record):
+        """Keep warnings and errors, sample the rest."""
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate(record.name)
+        return rate >= 1 or random.random() < rate
+
+
+class AsyncJsonHandler(logging.Handler):
+    """Queue records and write them as JSON lines from a background thread.
+
+    :param stream: Where lines are written; ``sys.stdout`` at write time if None.
+    :param queue_size: Records held before new ones are dropped.
+    :param max_length: Characters kept of messages and extra fields; tracebacks
+        keep four times as many, from the end.
+    """
+
+    def __init__(self, stream=None, queue_size=10000, max_length=2000, batch_size=256):
+        """Create instance."""
+        super().__init__()
+        self.stream = stream
+        self.queue_size = queue_size
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.interval = 0.05
+        self.dropped = 0
+        self._records = collections.deque()
+        self._writer_pid = None
+        self._start_lock = threading.Lock()
+        self._write_lock = _allocate_lock()
+        self._formatter = logging.Formatter()
+
+    def prepare(self, record):
+        """Reduce ``record`` to a JSON-ready dict of bounded size."""
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": truncate(record.getMessage(), self.max_length),
+        }
+        if record.exc_info:
+            entry["exception"] = truncate(
+                self._formatter.formatException(record.exc_info),
+                self.max_length * 4,
+                keep_end=True,
+            )
+        for key, value in vars(record).items():
+            if key in _RECORD_ATTRIBUTES or key in entry:
+                continue
+            if not isinstance(value, (bool, int, float, type(None))):
+                value = truncate(str(value), self.max_length)
+            entry[key] = value
+        if has_request_context():
+            entry["method"] = request.method
+            entry["path"] = truncate(request.path, self.max_length)
+        return entry
+
+    def emit(self, record):
+        """Queue ``record`` without waiting for the output."""
+        try:
+            entry = self.prepare(record)
+        except Exception:  # noqa: B902
+            self.handleError(record)
+            return
+        self._ensure_writer()
+        if len(self._records) >= self.queue_size:
+            self.dropped += 1
+            return
+        self._records.append(entry)
+
+    def _ensure_writer(self):
+        """Start this process' writer thread, after start-up or a fork."""
+        pid = os.getpid()
+        if self._writer_pid != pid:
+            with self._start_lock:
+                if self._writer_pid != pid:
+                    # A forked child would duplicate the parent's pending lines.
+                    self._records.clear()
+                    self.dropped = 0
+                    self._writer_pid = pid
+                    _start_new_thread(self._run, ())
+
+    def _run(self):
+        pid = os.getpid()
+        while self._writer_pid == pid:
+            if not self.write_pending():
+                _sleep(self.interval)
+
+    def write_pending(self):
+        """Write up to ``batch_size`` queued records; return how many were written."""
+        with self._write_lock:
+            lines = []
+            if self.dropped:
+                dropped, self.dropped = self.dropped, 0
+                lines.append(
+                    json.dumps(
+                        {
+                            "time": datetime.now(timezone.utc).isoformat(
+                                timespec="milliseconds"
+                            ),
+                            "level": "WARNING",
+                            "logger": __name__,
+                            "message": f"Dropped {dropped} log records",
+                        }
+                    )
+                )
+            while self._records and len(lines) < self.batch_size:
+                lines.append(json.dumps(self._records.popleft(), default=str))
+            if lines:
+                stream = self.stream or sys.stdout
+                try:
+                    stream.write("\n".join(lines) + "\n")
+                    stream.flush()
+                except (OSError, ValueError):
+                    pass
+            return len(lines)
+
+    def flush(self):
+        """Write everything queued so far, on the calling thread."""
+        while self.write_pending():
+            pass
+
+    def close(self):
+        """Stop the writer thread once everything queued is written."""
+        self._writer_pid = None
+        self.flush()
+        super().close()
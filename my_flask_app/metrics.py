@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Prometheus instrumentation of requests and SQL, served at ``/metrics``.
+
+Each request is labelled with its endpoint (``blueprint.view``), which keeps
+label cardinality bounded. Under gunicorn, set ``PROMETHEUS_MULTIPROC_DIR``
+before the workers import the app (``gunicorn.conf.py`` does) so every
+worker writes its samples to shared files and ``/metrics`` aggregates them,
+whichever worker answers the scrape.
+"""
+import os
+import time
+
+from flask import Response, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time spent in the view and its after_request hooks.",
+    ["endpoint", "method"],
+)
+REQUEST_COUNT = Counter(
+    "http_requests", "Requests answered.", ["endpoint", "method", "status"]
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Size of non-streamed response bodies.",
+    ["endpoint"],
+    buckets=[2**exponent for exponent in range(8, 27, 2)],
+)
+SQL_QUERIES = Histogram(
+    "http_request_sql_queries",
+    "SQL statements executed per request.",
+    ["endpoint"],
+    buckets=[0, 1, 2, 3, 5, 10, 20, 50, 100],
+)
+SQL_DURATION = Histogram(
+    "http_request_sql_duration_seconds",
+    "Time spent executing SQL statements per request.",
+    ["endpoint"],
+)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_sql_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _record_sql(conn):
+    started = conn.info["metrics_query_start"].pop()
+    if has_request_context() and "metrics_sql_queries" in g:
+        g.metrics_sql_queries += 1
+        g.metrics_sql_seconds += time.perf_counter() - started
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_sql_timer(conn, cursor, statement, parameters, context, executemany):
+    _record_sql(conn)
+
+
+@event.listens_for(Engine, "handle_error")
+def _stop_failed_sql_timer(context):
+    # A failed statement gets no after_cursor_execute; its start time would
+    # otherwise stay on the pooled connection and skew the next statement.
+    conn = context.connection
+    if conn is not None and context.execution_context is not None:
+        if conn.info.get("metrics_query_start"):
+            _record_sql(conn)
+
+
+def _endpoint():
+    return request.endpoint or "<unmatched>"
+
+
+class Metrics(object):
+    """Flask extension recording request metrics and exposing ``/metrics``."""
+
+    def init_app(self, app):
+        """Register the request hooks and the ``/metrics`` route."""
+        app.config.setdefault("METRICS_ENABLED", True)
+        if not app.config["METRICS_ENABLED"]:
+            return
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.add_url_rule("/metrics", "metrics", self.export)
+
+    def before_request(self):
+        """Start timing the request and counting its SQL."""
+        g.metrics_started = time.perf_counter()
+        g.metrics_sql_queries = 0
+        g.metrics_sql_seconds = 0.0
+
+    def after_request(self, response):
+        """Record latency, status, size and SQL usage of the request."""
+        if "metrics_started" not in g:
+            return response
+        endpoint = _endpoint()
+        REQUEST_LATENCY.labels(endpoint, request.method).observe(
+            time.perf_counter() - g.metrics_started
+        )
+        REQUEST_COUNT.labels(endpoint, request.method, response.status_code).inc()
+        if not response.is_streamed:
+            RESPONSE_SIZE.labels(endpoint).observe(response.calculate_content_length())
+        SQL_QUERIES.labels(endpoint).observe(g.metrics_sql_queries)
+        SQL_DURATION.labels(endpoint).observe(g.metrics_sql_seconds)
+        return response
+
+    def export(self):
+        """Render every metric in the Prometheus text exposition format."""
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+metrics = Metrics()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""Dashboard aggregates, served one per endpoint or all at once as a bundle.
+
+Each section reads through the connection it is given, so the bundle can run
+them concurrently, each on its own pooled connection. The pool is made of
+threads; under ``gunicorn -k gevent`` those are greenlets, which overlap
+whenever the database driver yields while waiting on the server.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from flask import current_app
+from sqlalchemy import text
+
+from my_flask_app.user.models import CourseFeedbackCount, Statistics
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def summary(connection):
+    """Totals and comment rate, read from the maintained statistics row."""
+    stats = Statistics.current(connection)
+    courses_number = stats["course_count"]
+    feedback_number = stats["feedback_count"]
+    return {
+        "courses_number": courses_number,
+        "feedback_number": feedback_number,
+        "comment_rate": "{:.2%}".format(
+            feedback_number / courses_number if courses_number else 0
+        ),
+        "users": stats["user_count"],
+        "real_name": "Welcome!",
+    }
+
+
+def barchart(connection):
+    """The five courses with the most feedback, from the maintained counts."""
+    return CourseFeedbackCount.top(5, connection)
+
+
+def piechart(connection):
+    """Number of courses of each type."""
+    return (
+        connection.execute(
+            text(
+                "select course_type,count(*) as course_type_num from course "
+                "group by course_type;"
+            )
+        )
+        .mappings()
+        .all()
+    )
+
+
+#: Sections of the bundle, in response order.
+SECTIONS = {"summary": summary, "barchart": barchart, "piechart": piechart}
+
+
+def _executor():
+    """Return this process' pool, creating it after start-up or a fork."""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                size = current_app.config.get("DASHBOARD_POOL_SIZE", 8)
+                _pool = ThreadPoolExecutor(size, "dashboard")
+                _pool_pid = pid
+    return _pool
+
+
+def _run(engine, section):
+    with engine.connect() as connection:
+        return section(connection)
+
+
+def bundle(engine, timeout):
+    """Compute every section concurrently on its own connection of ``engine``.
+
+    Sections still running after ``timeout`` seconds, or that failed, are
+    left out of the result and named in its ``errors``.
+    """
+    deadline = time.monotonic() + timeout
+    futures = {
+        name: _executor().submit(_run, engine, section)
+        for name, section in SECTIONS.items()
+    }
+    result, errors = {}, {}
+    for name, future in futures.items():
+        try:
+            result[name] = future.result(max(0, deadline - time.monotonic()))
+        except FutureTimeout:
+            future.cancel()
+            errors[name] = "timeout"
+        except Exception:  # noqa: B902
+            current_app.logger.exception("Dashboard section %s failed", name)
+            errors[name] = "failed"
+    if errors:
+        result["errors"] = errors
+    return result
@@ -4,8 +4,11 @@ from flask_wtf import FlaskForm
 from wtforms import PasswordField, StringField
 from wtforms.validators import DataRequired
 
+from my_flask_app.hashing import PasswordHasherBusy
 from my_flask_app.user.models import User
 
+BUSY_MESSAGE = "Too many sign-ins in progress, please try again"
+
 
 class LoginForm(FlaskForm):
     """Login form."""
@@ -29,7 +32,12 @@ class LoginForm(FlaskForm):
             self.username.errors.append("Unknown username")
             return False
 
-        if not self.user.check_password(self.password.data):
+        try:
+            password_valid = self.user.check_password(self.password.data)
+        except PasswordHasherBusy:
+            self.password.errors.append(BUSY_MESSAGE)
+            return False
+        if not password_valid:
             self.password.errors.append("Invalid password")
             return False
 
@@ -61,7 +69,12 @@ class LoginFormUW(FlaskForm):
             self.username.errors.append("Unknown username")
             return False
 
-        if not self.user.check_password(self.password.data):
+        try:
+            password_valid = self.user.check_password(self.password.data)
+        except PasswordHasherBusy:
+            self.password.errors.append(BUSY_MESSAGE)
+            return False
+        if not password_valid:
             self.password.errors.append("Invalid password")
             return False
 
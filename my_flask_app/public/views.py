@@ -2,30 +2,43 @@
 """Public section, including homepage and signup."""
 from flask import (
     Blueprint,
+    Response,
     current_app,
     flash,
     redirect,
     render_template,
     request,
+    stream_with_context,
     url_for,
 )
 from flask_login import login_required, login_user, logout_user
 from flask import jsonify
+from my_flask_app import search as search_index
+from my_flask_app.caching import cached_until_changed
 from my_flask_app.extensions import login_manager, cache
+from my_flask_app.hashing import PasswordHasherBusy
+from my_flask_app.ingest import feedback_ingest
+from my_flask_app.public import dashboard
 from my_flask_app.public.forms import LoginForm,LoginFormUW
+from my_flask_app.replicas import read_replica
+from my_flask_app.user.identity import user_identities
 from my_flask_app.user.forms import RegisterForm, RegisterFormUW, FeedbackForm
 from my_flask_app.user.models import User, Course, Feedback
-from my_flask_app.utils import flash_errors
+from my_flask_app.versioning import conditional
+from my_flask_app.utils import flash_errors, get_page_args, iter_json_rows
 from my_flask_app.extensions import db
-from sqlalchemy import text
 
 blueprint = Blueprint("public", __name__, static_folder="../static")
 
+NDJSON_MIMETYPE = "application/x-ndjson"
+FEEDBACK_FIELDS = ("course_name", "username", "feedback")
+REGISTRATION_BUSY_MESSAGE = "Too many registrations in progress, please try again."
+
 
 @login_manager.user_loader
 def load_user(user_id):
-    """Load user by ID."""
-    return User.get_by_id(int(user_id))
+    """Load the user identity by ID, from the process cache when possible."""
+    return user_identities.get(user_id)
 
 
 @blueprint.route("/", methods=["GET", "POST"])
@@ -59,12 +72,17 @@ def register():
     """Register new user."""
     form = RegisterForm(request.form)
     if form.validate_on_submit():
-        User.create(
-            username=form.username.data,
-            email=form.email.data,
-            password=form.password.data,
-            active=True,
-        )
+        try:
+            User.create(
+                username=form.username.data,
+                email=form.email.data,
+                password=form.password.data,
+                active=True,
+            )
+        except PasswordHasherBusy:
+            db.session.rollback()
+            flash(REGISTRATION_BUSY_MESSAGE, "warning")
+            return render_template("public/register.html", form=form)
         flash("Thank you for registering. You can now log in.", "success")
         return redirect(url_for("public.home"))
     else:
@@ -113,16 +131,19 @@ def login():
 def reg():
     form = RegisterFormUW(request.form)
     if form.validate_on_submit():
-        print(User)
-
-        User.create(
-            first_name=form.firstName.data,
-            last_name=form.lastName.data,
-            username=form.email.data,
-            email=form.email.data,
-            password=form.password.data,
-            active=True,
-        )
+        try:
+            User.create(
+                first_name=form.firstName.data,
+                last_name=form.lastName.data,
+                username=form.email.data,
+                email=form.email.data,
+                password=form.password.data,
+                active=True,
+            )
+        except PasswordHasherBusy:
+            db.session.rollback()
+            flash(REGISTRATION_BUSY_MESSAGE, "warning")
+            return render_template("startbootstrap-sb-admin-2-gh-pages/register.html", form=form)
         flash("Thank you for registering. You can now log in.", "success")
         return redirect(url_for("public.login"))
     else:
@@ -150,126 +171,126 @@ users = [
 ]
 
 @blueprint.route("/tables", methods=["GET"])
+@read_replica
+@conditional(Course)
 def tables():
-    # """Home page."""
-    # form = LoginFormUW(request.form)
-    # current_app.logger.info("Hello from the home page!")
-    # # Handle logging in
-    # if request.method == "GET":
-    #     current_app.logger.info("Hello from the home page POST!")
-    #     if form.validate_on_submit():
-    #         current_app.logger.info("Hello from the home page POST validate_on_submit!")
-    #         login_user(form.user)
-    #         current_app.logger.info("Hello from the home page POST validate_on_submit user login success!")
-    #         flash("You are logged in.", "success")
-    #         redirect_url = request.args.get("next") or url_for("public.index")
-    #         return redirect(redirect_url)
-    #     else:
-    #         # flash("username or password error", "error")
-    #         flash_errors(form)
-    # return render_template("startbootstrap-sb-admin-2-gh-pages/login.html",form=form)
-    # 获取分页后的用户数据
-
-    courses = Course.get_all_data()
-    print(courses)
-    users = User.get_all_data()
-    # print("courses =  + " + str(courses))
-    # users = db.session.execute(text("select * from users"))
-    # 将 User 对象列表转换为字典列表
-    users_list = [user.to_dict() for user in users]
-    # users_list = [
-    #     {key: (value.decode('utf-8') if isinstance(value, bytes) else value) for key, value in row._mapping.items()}
-    #     for row in users
-    # ]
-    courses_list = [course.to_dict() for course in courses]
-    print("courses_list = " + str(courses_list))
-    print("users_list = " + str(users_list))
-    return jsonify(courses_list)
-
+    """List courses one keyset page at a time.
+
+    Pass the returned ``next_cursor`` back as ``after`` to fetch the next page.
+    ``fields=list`` leaves out the descriptions.
+    """
+    after, limit = get_page_args()
+    fields = request.args.get("fields", "detail")
+    try:
+        courses, next_cursor = Course.paginate_after(
+            after=after, limit=limit, fields=fields
+        )
+    except KeyError:
+        return jsonify({"message": f"Unknown field set {fields!r}"}), 400
+    return jsonify({"data": courses, "next_cursor": next_cursor})
 
 
 @blueprint.route("/feedbacks", methods=["GET"])
+@read_replica
+@conditional(Feedback)
 def feedbacks():
-    # """Home page."""
-    # form = LoginFormUW(request.form)
-    # current_app.logger.info("Hello from the home page!")
-    # # Handle logging in
-    # if request.method == "GET":
-    #     current_app.logger.info("Hello from the home page POST!")
-    #     if form.validate_on_submit():
-    #         current_app.logger.info("Hello from the home page POST validate_on_submit!")
-    #         login_user(form.user)
-    #         current_app.logger.info("Hello from the home page POST validate_on_submit user login success!")
-    #         flash("You are logged in.", "success")
-    #         redirect_url = request.args.get("next") or url_for("public.index")
-    #         return redirect(redirect_url)
-    #     else:
-    #         # flash("username or password error", "error")
-    #         flash_errors(form)
-    # return render_template("startbootstrap-sb-admin-2-gh-pages/login.j",form=form)
-    # 获取分页后的用户数据
-    feedbacks = db.session.execute(text("select c.course_name,f.feedback,u.username from feedback f"
-                                        " left join course c on f.course_id = c.id left join users u "
-                                        "on f.user_id = u.id")).mappings()
-    # feedbacks = Feedback.get_all_data()
-    print(str(feedbacks))
-    # users = User.get_all_data()
-    # print("courses =  + " + str(courses))
-    # users = db.session.execute(text("select * from users"))
-    # 将 User 对象列表转换为字典列表
-    feedback_list = [dict(feedback) for feedback in feedbacks]
-    # users_list = [
-    #     {key: (value.decode('utf-8') if isinstance(value, bytes) else value) for key, value in row._mapping.items()}
-    #     for row in users
-    # ]
-    print("feedback_list = " + str(feedback_list))
-    return jsonify(feedback_list)
+    """Stream every feedback with its course name and username.
+
+    Rows are fetched ``STREAM_BATCH_SIZE`` at a time and written out as they
+    arrive, as a JSON array by default or as NDJSON with ``?format=ndjson``.
+    The names are read from the copies kept on each feedback row, so this is
+    a scan of the feedback table alone.
+    """
+    best = request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE])
+    ndjson = request.args.get("format") == "ndjson" or best == NDJSON_MIMETYPE
+    result = db.session.execute(
+        Feedback.select_fields("list"),
+        execution_options={"yield_per": current_app.config["STREAM_BATCH_SIZE"]},
+    ).mappings()
+    return Response(
+        stream_with_context(iter_json_rows(result, ndjson=ndjson)),
+        mimetype=NDJSON_MIMETYPE if ndjson else "application/json",
+    )
+
 
 @blueprint.route("/dashboard/summary", methods=["GET"])
+@conditional(Course, Feedback, User)
+@cached_until_changed("dashboard/summary", Course, Feedback, User)
 def summary():
-
-    coursesNumber = len(Course.get_all_data())
-    feedbackNumber = len(Feedback.get_all_data())
-    userNumber = len(User.get_all_data())
-
-
-
-    data = {
-        "courses_number": coursesNumber,
-        "feedback_number": feedbackNumber,
-        "comment_rate": "{:.2%}".format(feedbackNumber/coursesNumber),
-        "users": userNumber,
-        "real_name": "Welcome!"
-    }
-    print(str(data))
-    return jsonify(data)
+    """Dashboard totals, read from the maintained statistics row."""
+    return jsonify(dashboard.summary(db.session.connection()))
 
 
 @blueprint.route("/dashboard/barchart", methods=["GET"])
+@conditional(Course, Feedback)
+@cached_until_changed("dashboard/barchart", Course, Feedback)
 def barchart():
-    barchartData = db.session.execute(text("select f.course_id,c.course_name, count(*) as feedback_num from feedback f left join course c on f.course_id = c.id group by course_id order by count(*) desc limit 5;")).mappings().all()
+    """The five courses with the most feedback, from the maintained counts."""
+    return jsonify(dashboard.barchart(db.session.connection()))
 
-    data = [dict(row) for row in barchartData]
-    print(str(data))
-    return jsonify(data)
 
 @blueprint.route("/dashboard/piechart", methods=["GET"])
+@conditional(Course)
+@cached_until_changed("dashboard/piechart", Course)
 def piechart():
-    piechartData = db.session.execute(text("select course_type,count(*) as course_type_num from course group by course_type;")).mappings().all()
-
-    data = [dict(row) for row in piechartData]
-    print(str(data))
-    return jsonify(data)
+    return jsonify(dashboard.piechart(db.session.connection()))
+
+
+@blueprint.route("/dashboard/bundle", methods=["GET"])
+@conditional(Course, Feedback, User)
+@cached_until_changed("dashboard/bundle", Course, Feedback, User)
+def dashboard_bundle():
+    """Every dashboard section in one response, computed concurrently.
+
+    Complete bundles are cached until a commit changes their tables. Sections
+    slower than ``DASHBOARD_SECTION_TIMEOUT`` or failing are named under
+    ``errors``; such partial bundles are not cached or tagged.
+    """
+    timeout = current_app.config.get("DASHBOARD_SECTION_TIMEOUT", 2.0)
+    data = dashboard.bundle(db.engine, timeout)
+    response = jsonify(data)
+    if "errors" in data:
+        response.cache_control.no_store = True
+    return response
+
+
+@blueprint.route("/search", methods=["GET"])
+@read_replica
+def search():
+    """Ranked full-text search over courses and feedback.
+
+    ``q`` holds the search terms, ``type`` restricts hits to ``course`` or
+    ``feedback``, and ``offset`` pages through the ranking.
+    """
+    query = request.args.get("q", "")
+    kind = request.args.get("type")
+    if kind is not None and kind not in search_index.indexes:
+        return jsonify({"message": f"Unknown search type {kind!r}"}), 400
+    _, limit = get_page_args()
+    offset = max(0, request.args.get("offset", 0, type=int))
+    try:
+        hits, next_offset = search_index.search(
+            query, kinds=[kind] if kind else None, limit=limit, offset=offset
+        )
+    except search_index.SearchUnavailable:
+        current_app.logger.warning("Search index missing; run flask rebuild-search-index")
+        return jsonify({"message": "Search is unavailable"}), 503
+    return jsonify({"data": hits, "next_offset": next_offset})
 
 
-@blueprint.route('/feedback/submit/', methods=['POST'])
+@blueprint.route("/feedback/submit/", methods=["POST"])
 def submit_feedback():
-    print("Headers:", request.headers)
-    print("Data:", request.data)
-
-    data = request.get_json()
+    """Spool a feedback submission; it is committed by the feedback writer."""
+    data = request.get_json(silent=True)
 
     if not data:
-        return jsonify({'message': 'No data received'}), 400
+        return jsonify({"message": "No data received"}), 400
+
+    record = {field: data.get(field) for field in FEEDBACK_FIELDS}
+    if not all(isinstance(value, str) and value.strip() for value in record.values()):
+        return jsonify({"message": "course_name, username and feedback are required"}), 400
+    if len(record["feedback"]) > Feedback.feedback.type.length:
+        return jsonify({"message": "Feedback is too long"}), 400
 
-    return jsonify({'message': 'Data received!'})
\ No newline at end of file
+    feedback_ingest.submit(record)
+    return jsonify({"message": "Data received!"}), 202
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""Read replica routing for read-only views.
+
+Each URI in ``SQLALCHEMY_REPLICA_URIS`` becomes a Flask-SQLAlchemy bind.
+Views decorated with :func:`read_replica` run their queries on one replica,
+picked round-robin per request, while flushes and DML statements still go to
+the primary. A client whose request committed anything is sent to the primary
+for ``REPLICA_READ_YOUR_WRITES`` seconds, so it does not read from a replica
+that has yet to receive its write.
+"""
+import itertools
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+#: Flask session key holding the time until which the client reads the primary.
+PRIMARY_UNTIL_KEY = "_primary_until"
+
+
+class RoutingSession(Session):
+    """Session sending reads to the replica chosen for the current view."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        """Return the replica engine for reads inside :func:`read_replica` views."""
+        replica = self.info.get("replica")
+        if replica is not None and bind is None and not self._flushing:
+            if not getattr(clause, "is_dml", False):
+                return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _remember_write(db_session):
+    """Flag requests that committed, for the read-your-writes window."""
+    if has_request_context():
+        g.replica_wrote = True
+
+
+class ReadReplicas(object):
+    """Flask extension registering the replica binds."""
+
+    def __init__(self):
+        """Create instance."""
+        self.keys = []
+        self._next = None
+
+    def init_app(self, app):
+        """Add a bind per replica URI; call before ``db.init_app``."""
+        app.config.setdefault("SQLALCHEMY_REPLICA_URIS", [])
+        app.config.setdefault("REPLICA_READ_YOUR_WRITES", 5.0)
+        self.keys = []
+        binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+        for number, uri in enumerate(app.config["SQLALCHEMY_REPLICA_URIS"]):
+            key = f"replica_{number}"
+            binds[key] = uri
+            self.keys.append(key)
+        app.config["SQLALCHEMY_BINDS"] = binds
+        self._next = itertools.cycle(self.keys).__next__ if self.keys else None
+        app.extensions["read_replicas"] = self
+        if self.keys:
+            app.after_request(self.after_request)
+
+    def choose(self):
+        """Return the bind key to read from, or None for the primary."""
+        if self._next is None:
+            return None
+        if session.get(PRIMARY_UNTIL_KEY, 0) > time.time():
+            return None
+        return self._next()
+
+    def after_request(self, response):
+        """Open the read-your-writes window of a client that committed."""
+        if g.get("replica_wrote"):
+            session[PRIMARY_UNTIL_KEY] = (
+                time.time() + current_app.config["REPLICA_READ_YOUR_WRITES"]
+            )
+        return response
+
+
+def read_replica(view):
+    """Run ``view``'s queries on a replica when any are configured.
+
+    Apply it outside :func:`my_flask_app.versioning.conditional` so the
+    versions behind the ``ETag`` are read from the same replica as the data.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        replica = current_app.extensions["read_replicas"].choose()
+        if replica is None:
+            return view(*args, **kwargs)
+        info = current_app.extensions["sqlalchemy"].session.info
+        info["replica"] = replica
+        try:
+            return view(*args, **kwargs)
+        finally:
+            info.pop("replica", None)
+
+    return wrapper
+
+
+read_replicas = ReadReplicas()
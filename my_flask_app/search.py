@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""Full-text search over course descriptions and feedback, backed by SQLite FTS5.
+
+Each searchable model has an FTS5 table whose ``rowid`` is the model's ``id``.
+Mapper hooks keep it in step with ORM writes inside the same transaction;
+``flask rebuild-search-index`` repopulates it after bulk loads or raw SQL.
+A database created before the index existed gets its tables, filled from the
+base tables, on the first write that needs them; until then searching raises
+:class:`SearchUnavailable`. On databases other than SQLite the hooks do
+nothing and searching is unavailable.
+"""
+import weakref
+
+from markupsafe import escape
+from sqlalchemy import DDL, event, text
+
+from .extensions import db
+from .user.models import Course, Feedback
+
+# Control characters cannot occur in stored text, so they safely mark
+# highlights until the snippet has been HTML-escaped.
+_HIGHLIGHT_START, _HIGHLIGHT_END = "\x02", "\x03"
+
+
+class SearchUnavailable(RuntimeError):
+    """The search tables do not exist in the database."""
+
+
+class SearchIndex(object):
+    """An FTS5 table mirroring some text columns of a model."""
+
+    def __init__(self, kind, model, columns, title):
+        """Create instance.
+
+        :param kind: Name of the hit type in search results.
+        :param model: Indexed model class.
+        :param columns: Indexed text columns, in FTS column order.
+        :param title: Column returned as the hit title.
+        """
+        self.kind = kind
+        self.model = model
+        self.columns = columns
+        self.title = title
+        self.table = f"{model.__tablename__}_search"
+        # Engines whose database is known to have the table.
+        self._ready = weakref.WeakSet()
+
+    @property
+    def create_ddl(self):
+        """DDL creating the FTS5 table if it does not exist."""
+        return (
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+            f"{', '.join(self.columns)}, tokenize='porter unicode61')"
+        )
+
+    def register(self):
+        """Attach table DDL and write hooks to the model."""
+        source = self.model.__table__
+        event.listen(
+            source, "after_create", DDL(self.create_ddl).execute_if(dialect="sqlite")
+        )
+        event.listen(
+            source,
+            "after_drop",
+            DDL(f"DROP TABLE IF EXISTS {self.table}").execute_if(dialect="sqlite"),
+        )
+        event.listen(source, "after_drop", self._forget)
+        event.listen(self.model, "after_insert", self._after_insert)
+        event.listen(self.model, "after_update", self._after_update)
+        event.listen(self.model, "after_delete", self._after_delete)
+
+    def exists(self, connection):
+        """Whether the database of ``connection`` has the table."""
+        if connection.dialect.name != "sqlite":
+            return False
+        if connection.engine in self._ready:
+            return True
+        found = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": self.table},
+        ).first()
+        if found:
+            self._ready.add(connection.engine)
+        return found is not None
+
+    def ensure(self, connection):
+        """Create the table, filled from the base table, if it is missing."""
+        if not self.exists(connection):
+            self.rebuild(connection)
+
+    def _forget(self, source, connection, **kwargs):
+        self._ready.discard(connection.engine)
+
+    def add(self, connection, rows):
+        """Index ``rows``, mappings holding ``id`` and every indexed column.
+
+        Entries already indexed under their ids are replaced, as a table just
+        filled from the base table already holds every row of the flush.
+        """
+        if connection.dialect.name != "sqlite" or not rows:
+            return
+        self.remove(connection, [row["id"] for row in rows])
+        columns = ", ".join(self.columns)
+        params = ", ".join(f":{column}" for column in self.columns)
+        connection.execute(
+            text(f"INSERT INTO {self.table}(rowid, {columns}) VALUES (:id, {params})"),
+            [
+                {column: row[column] for column in ("id",) + self.columns}
+                for row in rows
+            ],
+        )
+
+    def remove(self, connection, ids):
+        """Drop the entries of ``ids`` from the index."""
+        if connection.dialect.name != "sqlite" or not ids:
+            return
+        self.ensure(connection)
+        connection.execute(
+            text(f"DELETE FROM {self.table} WHERE rowid = :id"),
+            [{"id": record_id} for record_id in ids],
+        )
+
+    def refresh(self, connection, ids):
+        """Re-index the rows of ``ids`` from the base table."""
+        if connection.dialect.name != "sqlite" or not ids:
+            return
+        table = self.model.__table__
+        rows = connection.execute(
+            db.select(table.c.id, *(table.c[column] for column in self.columns)).where(
+                table.c.id.in_(ids)
+            )
+        ).mappings()
+        self.add(connection, rows.all())
+
+    def _row(self, target):
+        row = {column: getattr(target, column) for column in self.columns}
+        row["id"] = target.id
+        return row
+
+    def _after_insert(self, mapper, connection, target):
+        self.add(connection, [self._row(target)])
+
+    def _after_update(self, mapper, connection, target):
+        self.add(connection, [self._row(target)])
+
+    def _after_delete(self, mapper, connection, target):
+        self.remove(connection, [target.id])
+
+    def rebuild(self, connection):
+        """Recreate the index from the base table; return the number of rows."""
+        columns = ", ".join(self.columns)
+        connection.execute(text(self.create_ddl))
+        connection.execute(text(f"DELETE FROM {self.table}"))
+        connection.execute(
+            text(
+                f"INSERT INTO {self.table}(rowid, {columns}) "
+                f"SELECT id, {columns} FROM {self.model.__tablename__}"
+            )
+        )
+        connection.execute(
+            text(f"INSERT INTO {self.table}({self.table}) VALUES ('optimize')")
+        )
+        self._ready.add(connection.engine)
+        return connection.execute(
+            text(f"SELECT count(*) FROM {self.table}")
+        ).scalar_one()
+
+    def search(self, match, limit):
+        """Return the ``limit`` best hits for an FTS5 ``match`` expression.
+
+        :raises SearchUnavailable: If the table does not exist.
+        """
+        if not self.exists(db.session.connection()):
+            raise SearchUnavailable(self.table)
+        rows = db.session.execute(
+            text(
+                f"SELECT rowid AS id, {self.title} AS title, "
+                f"snippet({self.table}, -1, :start, :end, '…', 16) AS snippet, "
+                f"bm25({self.table}) AS rank "
+                f"FROM {self.table} WHERE {self.table} MATCH :match "
+                "ORDER BY rank LIMIT :limit"
+            ),
+            {
+                "match": match,
+                "limit": limit,
+                "start": _HIGHLIGHT_START,
+                "end": _HIGHLIGHT_END,
+            },
+        ).mappings()
+        return [dict(row, type=self.kind) for row in rows]
+
+
+indexes = {
+    "course": SearchIndex(
+        "course",
+        Course,
+        ("course_name", "course_code", "course_description"),
+        title="course_name",
+    ),
+    "feedback": SearchIndex(
+        "feedback", Feedback, ("course_name", "feedback"), title="course_name"
+    ),
+}
+for _index in indexes.values():
+    _index.register()
+
+
+def to_match_expression(query):
+    """Quote every term of a user query so FTS5 syntax cannot be injected."""
+    terms = query.split()
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def highlight(snippet):
+    """HTML-escape a snippet and turn the highlight markers into ``<mark>``."""
+    return (
+        str(escape(snippet or ""))
+        .replace(_HIGHLIGHT_START, "<mark>")
+        .replace(_HIGHLIGHT_END, "</mark>")
+    )
+
+
+def search(query, kinds=None, limit=20, offset=0):
+    """Rank hits across ``kinds`` of records for a user query.
+
+    :param query: Free text, every term must match.
+    :param kinds: Hit types to search, defaults to all of them.
+    :param limit: Page size.
+    :param offset: Number of hits to skip.
+    :returns: A ``(hits, next_offset)`` tuple, ``next_offset`` is ``None`` on
+        the last page.
+    :raises SearchUnavailable: If an index has not been created yet.
+    """
+    match = to_match_expression(query)
+    if not match:
+        return [], None
+    hits = []
+    for kind in kinds or indexes:
+        # Any hit on the requested page is within the top offset+limit+1 of its index.
+        hits.extend(indexes[kind].search(match, offset + limit + 1))
+    hits.sort(key=lambda hit: hit["rank"])
+    end = offset + limit
+    page = hits[offset:end]
+    for hit in page:
+        hit["snippet"] = highlight(hit["snippet"])
+    next_offset = end if len(hits) > end else None
+    return page, next_offset
@@ -19,7 +19,39 @@ SEND_FILE_MAX_AGE_DEFAULT = env.int("SEND_FILE_MAX_AGE_DEFAULT")
 BCRYPT_LOG_ROUNDS = env.int("BCRYPT_LOG_ROUNDS", default=13)
 DEBUG_TB_ENABLED = DEBUG
 DEBUG_TB_INTERCEPT_REDIRECTS = False
-CACHE_TYPE = (
-    "flask_caching.backends.SimpleCache"  # Can be "MemcachedCache", "RedisCache", etc.
-)
+# Load the debug toolbar and Flask-Migrate only where they are used
+LAZY_EXTENSIONS = env.bool("LAZY_EXTENSIONS", default=True)
+# Compiled templates shared by the workers; defaults to instance/jinja-cache
+TEMPLATE_CACHE_ENABLED = env.bool("TEMPLATE_CACHE_ENABLED", default=True)
+TEMPLATE_CACHE_DIR = env.str("TEMPLATE_CACHE_DIR", default=None)
+# Shared by the workers of a host; can be "SimpleCache", "RedisCache", etc.
+CACHE_TYPE = env.str("CACHE_TYPE", default="my_flask_app.shared_cache.SharedCache")
+# Must belong to the app user and be closed to others; a per-user /dev/shm directory by default
+CACHE_DIR = env.str("CACHE_DIR", default=None)
+CACHE_SHARED_MAX_BYTES = env.int("CACHE_SHARED_MAX_BYTES", default=64 * 1024 * 1024)
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+PAGE_SIZE_DEFAULT = env.int("PAGE_SIZE_DEFAULT", default=100)
+PAGE_SIZE_MAX = env.int("PAGE_SIZE_MAX", default=1000)
+STREAM_BATCH_SIZE = env.int("STREAM_BATCH_SIZE", default=500)
+FEEDBACK_SPOOL_DIR = env.str("FEEDBACK_SPOOL_DIR", default=None)
+FEEDBACK_BATCH_SIZE = env.int("FEEDBACK_BATCH_SIZE", default=500)
+FEEDBACK_FLUSH_INTERVAL = env.float("FEEDBACK_FLUSH_INTERVAL", default=0.5)
+FEEDBACK_SPOOL_FSYNC = env.bool("FEEDBACK_SPOOL_FSYNC", default=True)
+FEEDBACK_MAX_ATTEMPTS = env.int("FEEDBACK_MAX_ATTEMPTS", default=5)
+BCRYPT_POOL_SIZE = env.int("BCRYPT_POOL_SIZE", default=None)
+BCRYPT_QUEUE_LIMIT = env.int("BCRYPT_QUEUE_LIMIT", default=16)
+USER_CACHE_SIZE = env.int("USER_CACHE_SIZE", default=1024)
+USER_CACHE_TTL = env.int("USER_CACHE_TTL", default=60)
+COMPRESS_MIN_SIZE = env.int("COMPRESS_MIN_SIZE", default=1024)
+COMPRESS_LEVEL = env.int("COMPRESS_LEVEL", default=6)
+METRICS_ENABLED = env.bool("METRICS_ENABLED", default=True)
+LOG_LEVEL = env.str("LOG_LEVEL", default="info")
+LOG_QUEUE_SIZE = env.int("LOG_QUEUE_SIZE", default=10000)
+LOG_MAX_LENGTH = env.int("LOG_MAX_LENGTH", default=2000)
+# Fraction of sub-WARNING records kept per logger, e.g. "my_flask_app=0.1"
+LOG_SAMPLING = env.dict("LOG_SAMPLING", subcast_values=float, default={})
+# Read-only views query these round-robin; writes always use DATABASE_URL
+SQLALCHEMY_REPLICA_URIS = env.list("SQLALCHEMY_REPLICA_URIS", default=[])
+REPLICA_READ_YOUR_WRITES = env.float("REPLICA_READ_YOUR_WRITES", default=5.0)
+DASHBOARD_POOL_SIZE = env.int("DASHBOARD_POOL_SIZE", default=8)
+DASHBOARD_SECTION_TIMEOUT = env.float("DASHBOARD_SECTION_TIMEOUT", default=2.0)
@@ -0,0 +1,373 @@
+# -*- coding: utf-8 -*-
+"""A Flask-Caching backend shared by every worker process of a host.
+
+Entries live in a SQLite file, by default on ``/dev/shm`` so it never
+touches a disk, which every worker maps into memory (``PRAGMA mmap_size``).
+SQLite's file locking makes each operation atomic across processes: a
+``delete_many`` issued by one worker is seen by all of them at once, and
+there is a single warm copy of each entry instead of one per worker.
+
+Select it with ``CACHE_TYPE = "my_flask_app.shared_cache.SharedCache"``;
+``CACHE_DIR`` sets the directory and ``CACHE_SHARED_MAX_BYTES`` bounds the
+stored values, least recently used entries being evicted beyond it.
+
+Values are pickled, so the file must only be writable by the app: the
+directory has to belong to the app's user and be closed to everyone else,
+which the default per-user directory under ``/dev/shm`` is.
+
+Workers are gevent processes, where a blocking SQLite call stalls every
+greenlet. Calls therefore wait at most ``BUSY_TIMEOUT`` for another process'
+lock; a busy cache reads as a miss and skips the write, while deletes, which
+invalidate data, retry a few times before giving up.
+"""
+import logging
+import os
+import pickle
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+from functools import wraps
+
+from flask_caching.backends.base import BaseCache
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_entries_accessed ON entries (accessed);
+CREATE TABLE IF NOT EXISTS usage (id INTEGER PRIMARY KEY, size INTEGER NOT NULL);
+INSERT OR IGNORE INTO usage VALUES (1, 0);
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    UPDATE usage SET size = size + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE usage SET size = size - old.size;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN
+    UPDATE usage SET size = size - old.size + new.size;
+END;
+"""
+
+#: Seconds between two recorded accesses of an entry; bounds writes on reads.
+ACCESS_RESOLUTION = 1.0
+
+#: Entries evicted per statement while over the size bound.
+EVICTION_BATCH = 32
+
+#: Seconds a call waits for another process' lock before giving up.
+BUSY_TIMEOUT = 0.05
+
+#: Attempts made by deletes on a busy cache, sleeping in between.
+DELETE_ATTEMPTS = 5
+
+
+def cache_path(directory=None, import_name="my_flask_app"):
+    """Path of the cache file of an app, in ``directory``.
+
+    Defaults to a directory of the current user under ``/dev/shm``, or under
+    the temporary directory where ``/dev/shm`` is missing.
+    """
+    if directory is None:
+        base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        directory = os.path.join(base, f"{import_name}-cache-{os.getuid()}")
+    return os.path.join(directory, f"{import_name}-cache.sqlite")
+
+
+def ensure_private(directory):
+    """Create ``directory`` if needed and check that only this user can write it.
+
+    :raises PermissionError: If it belongs to another user or is group or
+        world writable, as another user could then plant pickles in the cache.
+    """
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    status = os.lstat(directory)
+    if not stat.S_ISDIR(status.st_mode) or status.st_uid != os.getuid():
+        raise PermissionError(f"Cache directory {directory} is not owned by this user")
+    if status.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(f"Cache directory {directory} is writable by others")
+
+
+def _busy(error):
+    """Whether ``error`` means another process holds the database lock."""
+    return isinstance(error, sqlite3.OperationalError) and "locked" in str(error)
+
+
+def _or_when_busy(default):
+    """Make a cache method return ``default`` when the database is busy."""
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return method(self, *args, **kwargs)
+            except sqlite3.OperationalError as error:
+                if not _busy(error):
+                    raise
+                return default
+
+        return wrapper
+
+    return decorator
+
+
+def _retry_when_busy(default):
+    """Retry a cache method on a busy database, then log and return ``default``."""
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            for attempt in range(1, DELETE_ATTEMPTS + 1):
+                try:
+                    return method(self, *args, **kwargs)
+                except sqlite3.OperationalError as error:
+                    if not _busy(error):
+                        raise
+                # Patched by gevent, so other greenlets run meanwhile.
+                time.sleep(BUSY_TIMEOUT * attempt)
+            logger.error("Shared cache busy, %s%r failed", method.__name__, args)
+            return default
+
+        return wrapper
+
+    return decorator
+
+
+def remove_cache_files(path):
+    """Delete a cache file with its WAL and shared-memory companions."""
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+class SharedCache(BaseCache):
+    """Cross-process LRU cache stored in a memory-mapped SQLite file.
+
+    :param path: The cache file; processes sharing it share the cache.
+    :param max_bytes: Bound on the total size of the pickled values.
+    :param default_timeout: Seconds entries live unless ``set`` says otherwise.
+    """
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, default_timeout=300):
+        """Create instance."""
+        super().__init__(default_timeout=default_timeout)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._connection = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        """Build the backend from the Flask-Caching configuration."""
+        path = cache_path(config.get("CACHE_DIR"), app.import_name)
+        ensure_private(os.path.dirname(path))
+        kwargs.pop("ignore_delete_many_errors", None)
+        kwargs.setdefault(
+            "max_bytes", config.get("CACHE_SHARED_MAX_BYTES", 64 * 1024 * 1024)
+        )
+        return cls(path, *args, **kwargs)
+
+    def _connect(self):
+        """Return this process' connection, opening it after start-up or a fork."""
+        if self._connection is None or self._pid != os.getpid():
+            if os.path.exists(self.path) and os.stat(self.path).st_uid != os.getuid():
+                raise PermissionError(f"Cache {self.path} is not owned by this user")
+            connection = sqlite3.connect(
+                self.path,
+                timeout=BUSY_TIMEOUT,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            try:
+                connection.execute("PRAGMA journal_mode=WAL")
+                # Losing the cache in a power cut is fine; waiting on fsync is not.
+                connection.execute("PRAGMA synchronous=OFF")
+                connection.execute(f"PRAGMA mmap_size={self.max_bytes * 2}")
+                connection.executescript(SCHEMA)
+            except BaseException:  # noqa: B902
+                connection.close()
+                raise
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def _execute(self, statement, parameters=()):
+        """Run one statement on its own; return the number of rows changed."""
+        with self._lock:
+            return self._connect().execute(statement, parameters).rowcount
+
+    def _fetchone(self, statement, parameters=()):
+        with self._lock:
+            return self._connect().execute(statement, parameters).fetchone()
+
+    def _transaction(self, operation):
+        """Run ``operation(connection)`` in one write transaction."""
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                result = operation(connection)
+                connection.execute("COMMIT")
+            except BaseException:  # noqa: B902
+                connection.execute("ROLLBACK")
+                raise
+            return result
+
+    def _expiry(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return None if timeout == 0 else time.time() + timeout
+
+    def _store(self, connection, key, value, expires):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        connection.execute(
+            "INSERT INTO entries VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE "
+            "SET value = excluded.value, size = excluded.size, "
+            "expires = excluded.expires, accessed = excluded.accessed",
+            (key, data, len(data), expires, time.time()),
+        )
+
+    def _evict(self, connection):
+        """Drop expired entries, then least recently used ones, to fit the bound."""
+        (size,) = connection.execute("SELECT size FROM usage").fetchone()
+        if size <= self.max_bytes:
+            return
+        connection.execute("DELETE FROM entries WHERE expires <= ?", (time.time(),))
+        while (
+            connection.execute("SELECT size FROM usage").fetchone()[0] > self.max_bytes
+        ):
+            connection.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY accessed LIMIT ?)",
+                (EVICTION_BATCH,),
+            )
+
+    @_or_when_busy(None)
+    def get(self, key):
+        """Return the value of ``key``, or None when missing or expired."""
+        now = time.time()
+        row = self._fetchone(
+            "SELECT value, expires, accessed FROM entries WHERE key = ?", (key,)
+        )
+        if row is None:
+            return None
+        value, expires, accessed = row
+        if expires is not None and expires <= now:
+            self._touch(
+                "DELETE FROM entries WHERE key = ? AND expires <= ?", (key, now)
+            )
+            return None
+        if now - accessed > ACCESS_RESOLUTION:
+            self._touch("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        return pickle.loads(value)
+
+    @_or_when_busy(None)
+    def _touch(self, statement, parameters):
+        """Housekeeping write of a read, skipped when the database is busy."""
+        self._execute(statement, parameters)
+
+    @_or_when_busy(False)
+    def has(self, key):
+        """Whether ``key`` holds an unexpired value."""
+        row = self._fetchone(
+            "SELECT 1 FROM entries WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        )
+        return row is not None
+
+    @_or_when_busy(False)
+    def set(self, key, value, timeout=None):
+        """Store ``value`` under ``key``, evicting others if over the bound."""
+
+        def operation(connection):
+            self._store(connection, key, value, self._expiry(timeout))
+            self._evict(connection)
+
+        self._transaction(operation)
+        return True
+
+    @_or_when_busy([])
+    def set_many(self, mapping, timeout=None):
+        """Store every item of ``mapping`` in one transaction."""
+
+        def operation(connection):
+            for key, value in mapping.items():
+                self._store(connection, key, value, self._expiry(timeout))
+            self._evict(connection)
+
+        self._transaction(operation)
+        return list(mapping)
+
+    @_or_when_busy(False)
+    def add(self, key, value, timeout=None):
+        """Store ``value`` only if ``key`` holds no unexpired value."""
+
+        def operation(connection):
+            connection.execute(
+                "DELETE FROM entries WHERE key = ? AND expires <= ?", (key, time.time())
+            )
+            if connection.execute(
+                "SELECT 1 FROM entries WHERE key = ?", (key,)
+            ).fetchone():
+                return False
+            self._store(connection, key, value, self._expiry(timeout))
+            self._evict(connection)
+            return True
+
+        return self._transaction(operation)
+
+    @_retry_when_busy(False)
+    def delete(self, key):
+        """Remove ``key``; return whether it existed."""
+        return self._execute("DELETE FROM entries WHERE key = ?", (key,)) > 0
+
+    @_retry_when_busy([])
+    def delete_many(self, *keys):
+        """Remove ``keys`` atomically, for every process at once."""
+        if not keys:
+            return []
+
+        def operation(connection):
+            deleted = []
+            for key in keys:
+                cursor = connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+                if cursor.rowcount:
+                    deleted.append(key)
+            return deleted
+
+        return self._transaction(operation)
+
+    @_retry_when_busy(False)
+    def clear(self):
+        """Remove every entry."""
+        self._execute("DELETE FROM entries")
+        return True
+
+    @_or_when_busy(None)
+    def inc(self, key, delta=1):
+        """Atomically add ``delta`` to the integer stored under ``key``."""
+
+        def operation(connection):
+            row = connection.execute(
+                "SELECT value, expires FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            value, expires = 0, self._expiry(None)
+            if row is not None and (row[1] is None or row[1] > time.time()):
+                value, expires = pickle.loads(row[0]), row[1]
+            value += delta
+            self._store(connection, key, value, expires)
+            return value
+
+        return self._transaction(operation)
+
+    def dec(self, key, delta=1):
+        """Atomically subtract ``delta`` from the integer stored under ``key``."""
+        return self.inc(key, -delta)
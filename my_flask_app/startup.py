@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Startup timing and the context tests that decide what gets loaded.
+
+``create_app`` times each of its phases with :class:`StartupTimer` and logs
+the result once the app is built; the timer stays available as
+``app.extensions["startup"]``. :func:`import_times` measures a cold import
+of the app in a fresh interpreter, for the ``flask startup-report`` command.
+"""
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+import click
+
+
+def is_cli():
+    """Whether the app is being created by a ``flask`` command."""
+    return click.get_current_context(silent=True) is not None
+
+
+class StartupTimer(object):
+    """Wall time and module imports of each phase of the app factory."""
+
+    def __init__(self):
+        """Create instance."""
+        self.started = time.perf_counter()
+        self.stopped = None
+        self.phases = {}
+        self.imports = {}
+
+    @contextmanager
+    def phase(self, name):
+        """Time the code run inside the ``with`` block as phase ``name``."""
+        modules = len(sys.modules)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = (time.perf_counter() - start) * 1000
+            self.imports[name] = len(sys.modules) - modules
+
+    def stop(self):
+        """Record the end of the app factory."""
+        self.stopped = time.perf_counter()
+
+    @property
+    def total(self):
+        """Milliseconds from creating the timer to :meth:`stop`, or until now."""
+        end = time.perf_counter() if self.stopped is None else self.stopped
+        return (end - self.started) * 1000
+
+    def report(self):
+        """Lines describing each phase, slowest first."""
+        lines = [f"create_app: {self.total:.1f} ms"]
+        for name, elapsed in sorted(self.phases.items(), key=lambda item: -item[1]):
+            lines.append(
+                f"  {name}: {elapsed:.1f} ms, {self.imports[name]} modules imported"
+            )
+        return lines
+
+
+def parse_import_times(output, limit=20):
+    """Return the ``limit`` slowest imports of ``python -X importtime`` output.
+
+    :returns: ``(module, self_ms, cumulative_ms)`` tuples, by cumulative time.
+    """
+    times = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, module = line.split(":", 1)[1].split("|")
+        if not own.strip().isdigit():
+            continue
+        times.append((module.strip(), int(own) / 1000, int(cumulative) / 1000))
+    times.sort(key=lambda item: -item[2])
+    return times[:limit]
+
+
+def import_times(config_object="my_flask_app.settings", limit=20):
+    """Import the app and call ``create_app`` in a new interpreter, timing imports."""
+    code = f"from my_flask_app.app import create_app; create_app({config_object!r})"
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    return parse_import_times(process.stderr, limit)
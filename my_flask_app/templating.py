@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Compiled templates shared by every worker through an on-disk cache.
+
+Jinja stores the compiled code of each template in ``TEMPLATE_CACHE_DIR``,
+keyed by template name and checked against the source, so a fresh worker
+loads the large dashboard templates instead of parsing and compiling them on
+first render, and an edited template is simply recompiled. ``flask
+precompile-templates`` fills the cache at deploy time.
+
+The cache is only an optimisation: a directory that cannot be created or
+written leaves templates compiled in memory, as without it.
+"""
+import logging
+import os
+
+from jinja2 import FileSystemBytecodeCache, TemplateError
+
+logger = logging.getLogger(__name__)
+
+#: Files of the template folders that are templates.
+TEMPLATE_SUFFIXES = (".html",)
+
+
+class TolerantBytecodeCache(FileSystemBytecodeCache):
+    """Bytecode cache treating an unusable directory as an empty cache."""
+
+    def __init__(self, directory):
+        """Create instance."""
+        super().__init__(directory)
+        self.warned = False
+
+    def load_bytecode(self, bucket):
+        """Load ``bucket``, leaving it empty if the file cannot be read."""
+        try:
+            super().load_bytecode(bucket)
+        except OSError:
+            pass
+
+    def dump_bytecode(self, bucket):
+        """Store ``bucket``, logging once if the directory is not writable."""
+        try:
+            super().dump_bytecode(bucket)
+        except OSError as error:
+            if not self.warned:
+                self.warned = True
+                logger.warning("Cannot write compiled templates: %s", error)
+
+
+class TemplateCache(object):
+    """Flask extension installing the Jinja bytecode cache."""
+
+    def init_app(self, app):
+        """Point the app's Jinja environment at the cache directory."""
+        app.config.setdefault("TEMPLATE_CACHE_ENABLED", True)
+        app.config.setdefault("TEMPLATE_CACHE_DIR", None)
+        app.extensions["template_cache"] = self
+        if not app.config["TEMPLATE_CACHE_ENABLED"]:
+            return
+        directory = app.config["TEMPLATE_CACHE_DIR"] or os.path.join(
+            app.instance_path, "jinja-cache"
+        )
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as error:
+            app.logger.warning("Template cache disabled: %s", error)
+            return
+        app.jinja_env.bytecode_cache = TolerantBytecodeCache(directory)
+
+    def precompile(self, app):
+        """Compile every template of ``app``, storing it in the cache.
+
+        Compiled templates also stay in the environment's memory, so a master
+        that precompiles before forking hands them to its workers.
+
+        :returns: The number of templates compiled, and a ``(name, error)``
+            pair for each one that failed to.
+        """
+        compiled, failed = 0, []
+        names = app.jinja_env.list_templates(
+            filter_func=lambda name: name.endswith(TEMPLATE_SUFFIXES)
+        )
+        for name in names:
+            try:
+                app.jinja_env.get_template(name)
+            except TemplateError as error:
+                failed.append((name, str(error)))
+            else:
+                compiled += 1
+        return compiled, failed
+
+
+template_cache = TemplateCache()
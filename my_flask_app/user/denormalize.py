@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Keep ``Feedback.course_name`` and ``Feedback.username`` in step with their sources.
+
+Feedback rows carry copies of their course's name and their author's
+username so feedback listings read a single table. Mapper hooks fill the
+copies when a feedback is written and rewrite them when a course or user is
+renamed; :func:`sync_feedback_names` repairs rows written by bulk statements.
+"""
+from sqlalchemy import and_, event, inspect, or_, select
+from sqlalchemy.orm import object_session
+
+from my_flask_app import search
+from my_flask_app.caching import mark_changed
+
+from .models import Course, Feedback, User
+
+#: Feedback ids per ``UPDATE``, keeping the ``IN`` lists of large renames bounded.
+SYNC_CHUNK_SIZE = 500
+
+
+def _source_names(table):
+    """Correlated subqueries reading the current names of a feedback row."""
+    return {
+        "course_name": select(Course.course_name)
+        .where(Course.id == table.c.course_id)
+        .scalar_subquery(),
+        "username": select(User.username)
+        .where(User.id == table.c.user_id)
+        .scalar_subquery(),
+    }
+
+
+def sync_feedback_names(connection, *criteria):
+    """Copy current names into the feedback rows matching ``criteria``.
+
+    Only rows whose copies differ are rewritten, and they are re-indexed for
+    search. Returns how many rows were rewritten.
+    """
+    table = Feedback.__table__
+    names = _source_names(table)
+    stale = or_(
+        *(table.c[column].is_distinct_from(source) for column, source in names.items())
+    )
+    ids = connection.scalars(select(table.c.id).where(and_(*criteria, stale))).all()
+    for start in range(0, len(ids), SYNC_CHUNK_SIZE):
+        end = start + SYNC_CHUNK_SIZE
+        chunk = ids[start:end]
+        connection.execute(table.update().where(table.c.id.in_(chunk)).values(names))
+    search.indexes["feedback"].refresh(connection, ids)
+    return len(ids)
+
+
+def _changed(target, attribute):
+    return inspect(target).attrs[attribute].history.has_changes()
+
+
+@event.listens_for(Feedback, "before_insert")
+@event.listens_for(Feedback, "before_update")
+def _copy_names(mapper, connection, target):
+    """Fill the copies of a feedback written through the ORM."""
+    if target.course_name is None or _changed(target, "course_id"):
+        target.course_name = connection.scalar(
+            select(Course.course_name).where(Course.id == target.course_id)
+        )
+    if target.username is None or _changed(target, "user_id"):
+        target.username = connection.scalar(
+            select(User.username).where(User.id == target.user_id)
+        )
+
+
+def _rename_listener(attribute, foreign_key):
+    """Build a listener rewriting feedback copies when ``attribute`` changes."""
+
+    def listener(mapper, connection, target):
+        if not _changed(target, attribute):
+            return
+        if sync_feedback_names(connection, foreign_key == target.id):
+            mark_changed(object_session(target), Feedback.__tablename__)
+
+    return listener
+
+
+event.listen(
+    Course, "after_update", _rename_listener("course_name", Feedback.course_id)
+)
+event.listen(User, "after_update", _rename_listener("username", Feedback.user_id))
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""Per-process cache of the user identities loaded by Flask-Login."""
+import threading
+import time
+from collections import OrderedDict
+
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .models import User
+
+
+class UserIdentity(UserMixin):
+    """The columns of a :class:`User` that requests need, detached from any session."""
+
+    __slots__ = (
+        "id",
+        "username",
+        "email",
+        "first_name",
+        "last_name",
+        "active",
+        "is_admin",
+    )
+
+    def __init__(self, **fields):
+        """Create instance."""
+        for name in self.__slots__:
+            setattr(self, name, fields[name])
+
+    @classmethod
+    def from_user(cls, user):
+        """Copy the identity of ``user``."""
+        return cls(**{name: getattr(user, name) for name in cls.__slots__})
+
+    @property
+    def is_active(self):
+        """Whether the user may log in."""
+        return bool(self.active)
+
+    @property
+    def full_name(self):
+        """Full user name."""
+        return f"{self.first_name} {self.last_name}"
+
+    def __repr__(self):
+        """Represent instance as a unique string."""
+        return f"<UserIdentity({self.username!r})>"
+
+
+class IdentityCache(object):
+    """TTL-bounded LRU of :class:`UserIdentity` records keyed by user id.
+
+    ORM updates and deletes of a user evict it from this process' cache;
+    other worker processes, and bulk or raw SQL writes, are only caught up
+    with once the entry expires after ``USER_CACHE_TTL`` seconds.
+    """
+
+    def __init__(self):
+        """Create instance."""
+        self.maxsize = 1024
+        self.ttl = 60
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read ``USER_CACHE_SIZE`` and ``USER_CACHE_TTL`` from ``app``."""
+        self.maxsize = app.config.get("USER_CACHE_SIZE", 1024)
+        self.ttl = app.config.get("USER_CACHE_TTL", 60)
+        self.clear()
+
+    def get(self, user_id):
+        """Return the identity of ``user_id``, selecting it only on a miss."""
+        user_id = int(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        user = User.get_by_id(user_id)
+        if user is None:
+            return None
+        identity = UserIdentity.from_user(user)
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, identity)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return identity
+
+    def invalidate(self, *user_ids):
+        """Forget the identities of ``user_ids``."""
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        """Forget every identity and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """Hit and miss counters plus the current size."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+user_identities = IdentityCache()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _evict_written_user(mapper, connection, target):
+    """Evict at flush, and again at commit in case a reader refilled it meanwhile."""
+    user_identities.invalidate(target.id)
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault("written_user_ids", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_committed_users(session):
+    user_identities.invalidate(*session.info.pop("written_user_ids", ()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_written_users(session):
+    session.info.pop("written_user_ids", None)
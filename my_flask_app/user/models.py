@@ -1,12 +1,55 @@
 # -*- coding: utf-8 -*-
 """User models."""
 import datetime as dt
+from collections import Counter
 
 from flask_login import UserMixin
+from sqlalchemy import event, func, inspect
 from sqlalchemy.ext.hybrid import hybrid_property
 
-from my_flask_app.database import Column, PkModel, db, reference_col, relationship
-from my_flask_app.extensions import bcrypt
+from my_flask_app.database import (
+    Column,
+    Model,
+    PkModel,
+    db,
+    reference_col,
+    relationship,
+)
+from my_flask_app.hashing import password_hasher
+
+
+def _add_to_counter(connection, table, key, column, delta):
+    """Add ``delta`` to ``column`` of the row matching ``key``, creating it if needed.
+
+    A missing row starts at ``max(delta, 0)``. Where the dialect supports it
+    this is a single ``INSERT ... ON CONFLICT DO UPDATE``, so two transactions
+    creating the row at once both count; elsewhere it is an ``UPDATE``
+    followed by an ``INSERT`` when no row matched.
+
+    :param key: Mapping of the row's primary key columns to their values.
+    """
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        # Imported here; only the dialect in use gets loaded.
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+
+        connection.execute(
+            insert(table)
+            .values({**key, column: max(delta, 0)})
+            .on_conflict_do_update(
+                index_elements=list(key), set_={column: table.c[column] + delta}
+            )
+        )
+        return
+    condition = db.and_(*(table.c[name] == value for name, value in key.items()))
+    result = connection.execute(
+        table.update().where(condition).values({column: table.c[column] + delta})
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values({**key, column: max(delta, 0)}))
 
 
 class Role(PkModel):
@@ -49,11 +92,11 @@ class User(UserMixin, PkModel):
     @password.setter
     def password(self, value):
         """Set password."""
-        self._password = bcrypt.generate_password_hash(value)
+        self._password = password_hasher.generate_password_hash(value)
 
     def check_password(self, value):
         """Check password."""
-        return bcrypt.check_password_hash(self._password, value)
+        return password_hasher.check_password_hash(self._password, value)
 
     @property
     def full_name(self):
@@ -64,71 +107,215 @@ class User(UserMixin, PkModel):
         """Represent instance as a unique string."""
         return f"<User({self.username!r})>"
 
-    def to_dict(self):
+    def to_dict(self, fields="detail"):
         """Convert User object to dictionary."""
-        return {
-            "id": self.id,
-            "username": self.username,
-            "email": self.email,
-            "full_name": self.full_name,
-            "first_name": self.first_name,
-            "last_name": self.last_name,
-            "active": self.active,
-            "is_admin": self.is_admin,
-            "created_at": self.created_at.isoformat() if self.created_at else None
-        }
+        data = super().to_dict(fields)
+        data["full_name"] = self.full_name
+        return data
 
 
 class Course(PkModel):
     """A course offered in the system."""
 
     __tablename__ = "course"
+    __fields__ = {
+        "list": ("id", "course_name", "course_code", "course_link", "semester"),
+    }
 
     id = Column(db.Integer, primary_key=True, autoincrement=True)
-    course_name = Column(db.String(255), nullable=False)
+    course_name = Column(db.String(255), nullable=False, index=True)
     course_description = Column(db.String(25500), nullable=True)
     course_code = Column(db.String(255), unique=True, nullable=False)
     course_link = Column(db.String(2550), nullable=True)
     semester = Column(db.String(255), nullable=False)
+    course_type = Column(db.Integer, nullable=True)
 
     def __repr__(self):
         """Represent instance as a unique string."""
         return f"<Course({self.id!r}, {self.course_name!r})>"
 
-    def to_dict(self):
-        """Convert Course object to dictionary."""
-        return {
-            "id": self.id,
-            "course_name": self.course_name,
-            "course_description": self.course_description,
-            "course_code": self.course_code,
-            "course_link": self.course_link,
-            "semester": self.semester
-        }
 
 class Feedback(PkModel):
     """A course offered in the system."""
 
     __tablename__ = "feedback"
+    __fields__ = {
+        "list": ("id", "course_id", "course_name", "username", "feedback"),
+    }
 
     id = Column(db.Integer, primary_key=True, autoincrement=True)
-    course_id = Column(db.Integer, nullable=False)
+    course_id = Column(db.Integer, nullable=False, index=True)
     feedback = Column(db.String(25500), nullable=True)
     user_id = Column(db.Integer, unique=True, nullable=False)
     course_name = Column(db.String(255))
     username = Column(db.String(255))
+
     def __repr__(self):
         """Represent instance as a unique string."""
         return f"<Course({self.id!r}, {self.course_name!r})>"
 
-    def to_dict(self):
-        """Convert Course object to dictionary."""
-        return {
-            "id": self.id,
-            "course_id": self.course_id,
-            "feedback": self.feedback,
-            "user_id": self.user_id,
-            "course_name": self.course_name,
-            "username": self.username
+
+class Statistics(PkModel):
+    """Row counts for the dashboard, kept in a single row.
+
+    The counts are maintained by mapper hooks inside the writing transaction,
+    so reading them never touches the counted tables. Bulk ``Query.delete``
+    and raw SQL bypass the hooks; run ``flask reconcile-stats`` afterwards.
+    """
+
+    __tablename__ = "statistics"
+
+    ROW_ID = 1
+    COUNTED = {"course_count": Course, "feedback_count": Feedback, "user_count": User}
+
+    course_count = Column(db.Integer, nullable=False, default=0)
+    feedback_count = Column(db.Integer, nullable=False, default=0)
+    user_count = Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        """Represent instance as a unique string."""
+        return (
+            f"<Statistics(courses={self.course_count}, "
+            f"feedback={self.feedback_count}, users={self.user_count})>"
+        )
+
+    @classmethod
+    def current(cls, connection=None):
+        """Return the counters as a dictionary with a single-row read.
+
+        :param connection: Connection to read with, defaults to ``db.session``.
+        """
+        row = (
+            (connection or db.session)
+            .execute(
+                db.select(cls.course_count, cls.feedback_count, cls.user_count).where(
+                    cls.id == cls.ROW_ID
+                )
+            )
+            .first()
+        )
+        if row is None:
+            return dict.fromkeys(cls.COUNTED, 0)
+        return dict(row._mapping)
+
+    @classmethod
+    def reconcile(cls):
+        """Recount every counted table and overwrite the stored counters."""
+        counts = {
+            column: db.session.query(func.count(model.id)).scalar()
+            for column, model in cls.COUNTED.items()
         }
+        stats = db.session.get(cls, cls.ROW_ID) or cls(id=cls.ROW_ID)
+        return stats.update(**counts)
+
+    @classmethod
+    def bump(cls, connection, column, delta):
+        """Add ``delta`` to one counter within the transaction of ``connection``."""
+        _add_to_counter(connection, cls.__table__, {"id": cls.ROW_ID}, column, delta)
+
+
+def _statistic_listener(column, delta):
+    """Build a mapper event listener that bumps ``column`` by ``delta``."""
+
+    def listener(mapper, connection, target):
+        Statistics.bump(connection, column, delta)
+
+    return listener
+
+
+for _column, _model in Statistics.COUNTED.items():
+    event.listen(_model, "after_insert", _statistic_listener(_column, 1))
+    event.listen(_model, "after_delete", _statistic_listener(_column, -1))
+
+
+class CourseFeedbackCount(Model):
+    """Feedback count of each course, ranked for the dashboard bar chart.
+
+    Maintained by mapper hooks like :class:`Statistics`, so the top courses
+    are read from an index instead of grouping every feedback row.
+    """
+
+    __tablename__ = "course_feedback_counts"
+    __table_args__ = (
+        db.Index("ix_course_feedback_counts_rank", "feedback_count", "course_id"),
+    )
+
+    course_id = Column(db.Integer, primary_key=True, autoincrement=False)
+    feedback_count = Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        """Represent instance as a unique string."""
+        return f"<CourseFeedbackCount({self.course_id}, {self.feedback_count})>"
+
+    @classmethod
+    def top(cls, limit=5, connection=None):
+        """Return the ``limit`` courses with the most feedback, most first.
+
+        :param connection: Connection to read with, defaults to ``db.session``.
+        """
+        feedback_num = cls.feedback_count.label("feedback_num")
+        return (
+            (connection or db.session)
+            .execute(
+                db.select(cls.course_id, Course.course_name, feedback_num)
+                .join(Course, Course.id == cls.course_id)
+                .where(cls.feedback_count > 0)
+                .order_by(cls.feedback_count.desc(), cls.course_id.desc())
+                .limit(limit)
+            )
+            .mappings()
+            .all()
+        )
+
+    @classmethod
+    def reconcile(cls):
+        """Recount the feedback of every course and overwrite the stored counts."""
+        table = cls.__table__
+        db.session.execute(table.delete())
+        db.session.execute(
+            table.insert().from_select(
+                ["course_id", "feedback_count"],
+                db.select(Feedback.course_id, func.count()).group_by(
+                    Feedback.course_id
+                ),
+            )
+        )
+        db.session.commit()
+
+    @classmethod
+    def bump(cls, connection, deltas):
+        """Add ``deltas``, a mapping of course ids to changes, to the counts."""
+        for course_id, delta in sorted(deltas.items()):
+            if delta:
+                _add_to_counter(
+                    connection,
+                    cls.__table__,
+                    {"course_id": course_id},
+                    "feedback_count",
+                    delta,
+                )
+
+
+@event.listens_for(Feedback, "after_insert")
+def _count_inserted_feedback(mapper, connection, target):
+    CourseFeedbackCount.bump(connection, {target.course_id: 1})
+
+
+@event.listens_for(Feedback, "after_delete")
+def _count_deleted_feedback(mapper, connection, target):
+    CourseFeedbackCount.bump(connection, {target.course_id: -1})
+
+
+@event.listens_for(Feedback, "after_update")
+def _count_moved_feedback(mapper, connection, target):
+    history = inspect(target).attrs.course_id.history
+    if history.has_changes() and history.deleted:
+        deltas = Counter({target.course_id: 1})
+        deltas[history.deleted[0]] -= 1
+        CourseFeedbackCount.bump(connection, deltas)
+
 
+@event.listens_for(Course, "after_delete")
+def _forget_deleted_course(mapper, connection, target):
+    table = CourseFeedbackCount.__table__
+    connection.execute(table.delete().where(table.c.course_id == target.id))
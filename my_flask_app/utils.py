@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 """Helper utilities and decorators."""
-from flask import flash
+from flask import current_app, flash, request
 
 
 def flash_errors(form, category="warning"):
@@ -8,3 +8,36 @@ def flash_errors(form, category="warning"):
     for field, errors in form.errors.items():
         for error in errors:
             flash(f"{getattr(form, field).label.text} - {error}", category)
+
+
+def get_page_args():
+    """Read keyset pagination arguments from the query string.
+
+    Returns an ``(after, limit)`` tuple; ``limit`` is clamped to ``PAGE_SIZE_MAX``.
+    """
+    after = request.args.get("after", type=int)
+    limit = request.args.get("limit", current_app.config["PAGE_SIZE_DEFAULT"], type=int)
+    limit = max(1, min(limit, current_app.config["PAGE_SIZE_MAX"]))
+    return after, limit
+
+
+def iter_json_rows(result, ndjson=False):
+    """Encode a mappings result incrementally, one partition per chunk.
+
+    :param result: A ``MappingResult`` executed with the ``yield_per`` option,
+        so each partition is a single server-side fetch.
+    :param ndjson: Emit newline-delimited JSON instead of a JSON array.
+    """
+    dumps = current_app.json.dumps
+    if not ndjson:
+        yield "["
+    separator = ""
+    for rows in result.partitions():
+        if ndjson:
+            yield "".join(dumps(row) + "\n" for row in rows)
+        else:
+            # One encoder call per partition; strip the list's brackets.
+            yield separator + dumps(rows)[1:-1]
+            separator = ","
+    if not ndjson:
+        yield "]"
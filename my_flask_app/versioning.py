@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Per-table content versions and conditional GET support for data endpoints.
+
+Every transaction writing to a versioned table bumps that table's counter in
+``table_versions`` before it commits (see :func:`my_flask_app.caching.mark_changed`).
+A response built from some tables is therefore identified by their versions,
+which is what :func:`conditional` turns into an ``ETag``.
+"""
+import hashlib
+from functools import wraps
+
+from flask import make_response, request
+
+from .database import Column, Model, db
+
+#: Tables whose versions are read by at least one conditional view.
+versioned_tables = set()
+
+
+class TableVersion(Model):
+    """Monotonic change counter of one table."""
+
+    __tablename__ = "table_versions"
+    tablename = Column(db.String(80), primary_key=True)
+    version = Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        """Represent instance as a unique string."""
+        return f"<TableVersion({self.tablename!r}, {self.version})>"
+
+    @classmethod
+    def bump(cls, connection, tablenames):
+        """Increment the versions of ``tablenames`` within ``connection``'s transaction."""
+        table = cls.__table__
+        for tablename in sorted(versioned_tables.intersection(tablenames)):
+            result = connection.execute(
+                table.update()
+                .where(table.c.tablename == tablename)
+                .values(version=table.c.version + 1)
+            )
+            if result.rowcount == 0:
+                connection.execute(
+                    table.insert().values(tablename=tablename, version=1)
+                )
+
+    @classmethod
+    def current(cls, tablenames):
+        """Return the versions of ``tablenames`` in one query, 0 if never written."""
+        versions = dict(
+            db.session.execute(
+                db.select(cls.tablename, cls.version).where(
+                    cls.tablename.in_(tablenames)
+                )
+            ).all()
+        )
+        return [versions.get(tablename, 0) for tablename in tablenames]
+
+
+def conditional(*models):
+    """Answer ``If-None-Match`` with 304 while ``models``' tables are unchanged.
+
+    The weak ETag covers the table versions, the full request path and the
+    ``Accept`` header, so the view and its serialization are skipped entirely
+    when the client already has the current representation.
+    """
+    tablenames = sorted(model.__tablename__ for model in models)
+    versioned_tables.update(tablenames)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = ",".join(map(str, TableVersion.current(tablenames)))
+            fingerprint = "|".join(
+                (request.full_path, request.headers.get("Accept", ""), versions)
+            )
+            etag = hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()
+            if request.if_none_match.contains_weak(etag):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                # Views mark incomplete representations as not storable.
+                if response.status_code != 200 or response.cache_control.no_store:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.cache_control.no_cache = True
+            response.vary.add("Accept")
+            return response
+
+        return wrapper
+
+    return decorator
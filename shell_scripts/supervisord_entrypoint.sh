@@ -5,4 +5,9 @@ if [ $# -eq 0 ] || [ "${1#-}" != "$1" ]; then
   set -- supervisord "$@"
 fi
 
+if [ "$1" = "supervisord" ]; then
+  # Fill the Jinja bytecode cache the workers share; a failure is not fatal.
+  flask --app autoapp precompile-templates || true
+fi
+
 exec "$@"
@@ -4,7 +4,7 @@ from factory import Sequence
 from factory.alchemy import SQLAlchemyModelFactory
 
 from my_flask_app.database import db
-from my_flask_app.user.models import User
+from my_flask_app.user.models import Course, Feedback, User
 
 
 class BaseFactory(SQLAlchemyModelFactory):
@@ -28,3 +28,27 @@ class UserFactory(BaseFactory):
         """Factory configuration."""
 
         model = User
+
+
+class CourseFactory(BaseFactory):
+    """Course factory."""
+
+    course_name = Sequence(lambda n: f"Course {n}")
+    course_code = Sequence(lambda n: f"CSE{n:04d}")
+    semester = "Fall"
+
+    class Meta:
+        """Factory configuration."""
+
+        model = Course
+
+
+class FeedbackFactory(BaseFactory):
+    """Feedback factory."""
+
+    feedback = Sequence(lambda n: f"Feedback {n}")
+
+    class Meta:
+        """Factory configuration."""
+
+        model = Feedback
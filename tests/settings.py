@@ -11,3 +11,10 @@ DEBUG_TB_ENABLED = False
 CACHE_TYPE = "flask_caching.backends.SimpleCache"  # Can be "memcached", "redis", etc.
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 WTF_CSRF_ENABLED = False  # Allows form testing
+PAGE_SIZE_DEFAULT = 100
+PAGE_SIZE_MAX = 1000
+STREAM_BATCH_SIZE = 2
+FEEDBACK_BATCH_SIZE = 2
+FEEDBACK_SPOOL_FSYNC = False
+FEEDBACK_WRITER_ENABLED = False  # Tests drain the spool explicitly
+TEMPLATE_CACHE_ENABLED = False  # Tests enable it with a temporary directory
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""Smoke test of the benchmark suite at a tiny scale."""
+import json
+
+from click.testing import CliRunner
+
+from benchmarks.__main__ import main
+
+
+def test_benchmark_writes_results(tmp_path):
+    """A tiny run seeds, measures every endpoint and compares against itself."""
+    output = tmp_path / "results.json"
+    args = ["--scale", "20", "--requests", "2", "--workdir", str(tmp_path)]
+    args += ["--endpoint", "tables", "--endpoint", "dashboard_summary"]
+    result = CliRunner().invoke(main, args + ["--output", str(output)])
+    assert result.exit_code == 0, result.output
+
+    results = json.loads(output.read_text())
+    endpoints = results["scales"]["20"]["endpoints"]
+    assert set(endpoints) == {"tables", "dashboard_summary"}
+    assert endpoints["tables"]["status"] == [200]
+    assert endpoints["tables"]["requests"] == 2
+    assert results["scales"]["20"]["seed_seconds"] is not None
+
+    args += ["--output", str(tmp_path / "again.json"), "--threshold", "1000"]
+    rerun = CliRunner().invoke(main, args + ["--compare", str(output)])
+    assert rerun.exit_code == 0, rerun.output
+    assert "p50_ms" in rerun.output
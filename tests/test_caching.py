@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""Stampede-protected view caching tests."""
+import threading
+import time
+
+from flask import jsonify
+
+from my_flask_app import caching
+from my_flask_app.caching import SingleFlight, cached_single_flight
+from my_flask_app.extensions import cache
+from my_flask_app.user.models import Course
+
+from .factories import CourseFactory
+
+
+class TestSingleFlight:
+    """One recompute however many callers miss."""
+
+    def test_concurrent_misses_compute_once(self, app):
+        """Callers arriving during a recompute wait for its result."""
+        calls = []
+        started = threading.Event()
+
+        @cached_single_flight("tests/slow")
+        def slow():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return "value"
+
+        results = []
+
+        def call():
+            with app.app_context():
+                results.append(slow().get_data(as_text=True))
+
+        first = threading.Thread(target=call)
+        first.start()
+        started.wait(5)
+        others = [threading.Thread(target=call) for _ in range(3)]
+        for thread in others:
+            thread.start()
+        for thread in [first, *others]:
+            thread.join(5)
+        assert results == ["value"] * 4
+        assert len(calls) == 1
+        assert not cache.has("tests/slow/lock")
+
+    def test_waiter_computes_after_holder_gives_up(self, app):
+        """A lock that is never followed by a value does not block forever."""
+        flight = SingleFlight("tests/orphan", wait=0.1)
+        assert flight.acquire()
+        assert flight(lambda: "mine")().get_data(as_text=True) == "mine"
+
+    def test_errors_are_not_cached(self, app):
+        """Error responses are recomputed on the next call."""
+        calls = []
+
+        @cached_single_flight("tests/error")
+        def failing():
+            calls.append(1)
+            return jsonify(error="nope"), 500
+
+        failing()
+        failing()
+        assert len(calls) == 2
+
+    def test_commit_during_fill_is_not_cached(self, db):
+        """A response outdated by a commit made while computing it is dropped."""
+        calls = []
+
+        @cached_single_flight("tests/courses", Course)
+        def courses():
+            count = Course.query.count()
+            calls.append(count)
+            if len(calls) == 1:
+                CourseFactory()
+                db.session.commit()
+            return str(count)
+
+        assert courses().get_data(as_text=True) == "0"
+        assert courses().get_data(as_text=True) == "1"
+        assert courses().get_data(as_text=True) == "1"
+        assert calls == [0, 1]
+
+    def test_waiter_reads_value_stored_as_lock_is_released(self, app, monkeypatch):
+        """A response stored just after a poll, with the lock, is not missed."""
+        flight = SingleFlight("tests/late", wait=1)
+        assert flight.acquire()
+        get = cache.get
+
+        def get_then_finish(key):
+            entry = get(key)
+            cache.set("tests/late", ("late", None))
+            flight.release()
+            monkeypatch.setattr(cache, "get", get)
+            return entry
+
+        monkeypatch.setattr(cache, "get", get_then_finish)
+        assert flight.wait_for_fill() == ("late", None)
+
+
+class TestRefreshAhead:
+    """Entries near expiry are recomputed in the background."""
+
+    def test_serves_stale_while_refreshing(self, app, monkeypatch):
+        """A caller past the refresh point gets the old value immediately."""
+        values = iter(["old", "new"])
+
+        @cached_single_flight("tests/ttl", timeout=10, refresh_ahead=0.5)
+        def view():
+            return next(values)
+
+        assert view().get_data(as_text=True) == "old"
+        later = time.time() + 6
+        monkeypatch.setattr(caching.time, "time", lambda: later)
+        assert view().get_data(as_text=True) == "old"
+        caching._refresh_executor().submit(lambda: None).result(5)
+        assert view().get_data(as_text=True) == "new"
+        assert not cache.has("tests/ttl/lock")
+
+    def test_fresh_entries_are_not_refreshed(self, app):
+        """Before the refresh point the cached value is all there is."""
+        calls = []
+
+        @cached_single_flight("tests/fresh", timeout=60)
+        def view():
+            calls.append(1)
+            return "value"
+
+        view()
+        view()
+        assert len(calls) == 1
+        assert cache.get("tests/fresh")[0].get_data(as_text=True) == "value"
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Response compression tests."""
+import gzip
+import json
+
+import pytest
+
+from my_flask_app.compression import compress
+from my_flask_app.extensions import cache
+
+from .factories import CourseFactory, FeedbackFactory, UserFactory
+
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+@pytest.fixture
+def client(app):
+    """Flask test client; WebTest would transparently decode gzip bodies."""
+    return app.test_client()
+
+
+class TestCompression:
+    """Compress extension."""
+
+    def test_large_json_is_gzipped(self, db, client):
+        """Bodies above the threshold are compressed when the client accepts it."""
+        CourseFactory.create_batch(20, course_description="x" * 200)
+        db.session.commit()
+        res = client.get("/tables", headers=GZIP)
+        assert res.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in res.headers["Vary"]
+        assert len(json.loads(gzip.decompress(res.data))["data"]) == 20
+
+    def test_small_or_unaccepted_is_identity(self, db, client):
+        """Small bodies and clients without gzip get the plain body."""
+        res = client.get("/tables", headers=GZIP)
+        assert "Content-Encoding" not in res.headers
+        CourseFactory.create_batch(20, course_description="x" * 200)
+        db.session.commit()
+        res = client.get("/tables")
+        assert "Content-Encoding" not in res.headers
+
+    def test_versioned_bodies_compressed_once(self, db, client, monkeypatch):
+        """Repeated responses for one ETag reuse the cached compressed body."""
+        CourseFactory.create_batch(20, course_description="x" * 200)
+        db.session.commit()
+        calls = []
+        original = compress.compress
+        monkeypatch.setattr(
+            compress, "compress", lambda *args: calls.append(args) or original(*args)
+        )
+        first = client.get("/tables", headers=GZIP)
+        second = client.get("/tables", headers=GZIP)
+        assert first.data == second.data
+        assert len(calls) == 1
+        etag = first.headers["ETag"].split('"')[1]
+        assert cache.get(f"compressed/gzip/{etag}") == first.data
+
+    def test_streamed_body_is_gzipped(self, db, client):
+        """Streamed responses are compressed incrementally."""
+        course = CourseFactory()
+        for user in UserFactory.create_batch(3):
+            db.session.flush()
+            FeedbackFactory(course_id=course.id, user_id=user.id)
+        db.session.commit()
+        res = client.get("/feedbacks", headers=GZIP)
+        assert res.headers["Content-Encoding"] == "gzip"
+        assert len(json.loads(gzip.decompress(res.data))) == 3
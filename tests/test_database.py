@@ -5,7 +5,7 @@ from flask_login import UserMixin
 from sqlalchemy import text
 from sqlalchemy.orm.exc import ObjectDeletedError
 
-from my_flask_app.database import Column, PkModel, db
+from my_flask_app.database import Column, PkModel, db, dispose_after_fork
 
 
 class ExampleUserModel(UserMixin, PkModel):
@@ -67,3 +67,16 @@ class TestPkModel:
     def test_get_by_id_wrong_type(self):
         """Test get_by_id returns None for non-numeric argument."""
         assert ExampleUserModel.get_by_id("xyz") is None
+
+
+class TestDisposeAfterFork:
+    """Connection pools of forked workers."""
+
+    def test_replaces_pool_without_closing(self, app):
+        """A new pool replaces the inherited one, whose connections stay open."""
+        inherited = db.engine.pool
+        connection = db.engine.connect()
+        dispose_after_fork(app)
+        assert db.engine.pool is not inherited
+        assert connection.execute(text("select 1")).scalar() == 1
+        connection.close()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Tests of the course name and username copies kept on feedback rows."""
+from sqlalchemy import insert
+
+from my_flask_app import search
+from my_flask_app.user.denormalize import sync_feedback_names
+from my_flask_app.user.models import Feedback
+
+from .factories import CourseFactory, FeedbackFactory, UserFactory
+
+
+def seed(db):
+    """A course with feedback from one user."""
+    course = CourseFactory(course_name="Compilers")
+    user = UserFactory(username="ada")
+    db.session.flush()
+    feedback = FeedbackFactory(course_id=course.id, user_id=user.id)
+    db.session.commit()
+    return course, user, feedback
+
+
+class TestFeedbackNames:
+    """Denormalized feedback names."""
+
+    def test_filled_on_insert(self, db):
+        """ORM inserts copy the names of the referenced rows."""
+        _, _, feedback = seed(db)
+        assert feedback.course_name == "Compilers"
+        assert feedback.username == "ada"
+
+    def test_course_rename_propagates(self, db):
+        """Renaming a course rewrites its feedback and their search entries."""
+        course, _, feedback = seed(db)
+        course.update(course_name="Parsing")
+        db.session.refresh(feedback)
+        assert feedback.course_name == "Parsing"
+        hits, _ = search.search("parsing", kinds=["feedback"])
+        assert [hit["id"] for hit in hits] == [feedback.id]
+
+    def test_user_rename_propagates(self, db):
+        """Renaming a user rewrites their feedback."""
+        _, user, feedback = seed(db)
+        user.update(username="lovelace")
+        db.session.refresh(feedback)
+        assert feedback.username == "lovelace"
+
+    def test_rename_changes_feedback_etag(self, db, testapp):
+        """Feedback listings are revalidated after a rename."""
+        course, _, _ = seed(db)
+        etag = testapp.get("/feedbacks").headers["ETag"]
+        course.update(course_name="Parsing")
+        res = testapp.get("/feedbacks", headers={"If-None-Match": etag})
+        assert res.status_code == 200
+        assert res.json[0]["course_name"] == "Parsing"
+
+    def test_sync_repairs_bulk_rows(self, db):
+        """Rows inserted without copies are filled by the sync."""
+        course, user, _ = seed(db)
+        other = UserFactory(username="grace")
+        db.session.flush()
+        db.session.execute(
+            insert(Feedback), [{"course_id": course.id, "user_id": other.id}]
+        )
+        assert sync_feedback_names(db.session.connection()) == 1
+        assert sync_feedback_names(db.session.connection()) == 0
+        db.session.commit()
+        row = Feedback.query.filter_by(user_id=other.id).one()
+        assert (row.course_name, row.username) == ("Compilers", "grace")
+
+    def test_backfill_command(self, app, db):
+        """The backfill command fills every batch."""
+        course = CourseFactory(course_name="Compilers")
+        users = UserFactory.create_batch(3)
+        db.session.flush()
+        db.session.execute(
+            insert(Feedback),
+            [{"course_id": course.id, "user_id": user.id} for user in users],
+        )
+        db.session.commit()
+        result = app.test_cli_runner().invoke(
+            args=["backfill-feedback-names", "--batch-size", "2"]
+        )
+        assert result.exit_code == 0, result.output
+        assert "Updated 3 feedback rows" in result.output
+        db.session.expire_all()
+        assert {row.course_name for row in Feedback.query} == {"Compilers"}
@@ -3,11 +3,16 @@
 
 See: http://webtest.readthedocs.org/
 """
+import json
+import time
+
 from flask import url_for
+from sqlalchemy import text
 
+from my_flask_app.public import dashboard
 from my_flask_app.user.models import User
 
-from .factories import UserFactory
+from .factories import CourseFactory, FeedbackFactory, UserFactory
 
 
 class TestLoggingIn:
@@ -118,3 +123,211 @@ class TestRegistering:
         res = form.submit()
         # sees error
         assert "Username already registered" in res
+
+
+class TestCourseListing:
+    """Paginated course listing."""
+
+    def test_tables_returns_next_cursor(self, db, testapp):
+        """Follow next_cursor until the last page."""
+        CourseFactory.create_batch(3)
+        db.session.commit()
+
+        res = testapp.get("/tables", {"limit": 2})
+        assert len(res.json["data"]) == 2
+        assert res.json["next_cursor"] == 2
+
+        res = testapp.get("/tables", {"limit": 2, "after": res.json["next_cursor"]})
+        assert [course["id"] for course in res.json["data"]] == [3]
+        assert res.json["next_cursor"] is None
+
+    def test_tables_field_sets(self, db, testapp):
+        """``fields=list`` leaves out descriptions; unknown sets are rejected."""
+        CourseFactory()
+        db.session.commit()
+        res = testapp.get("/tables")
+        assert "course_description" in res.json["data"][0]
+        res = testapp.get("/tables", {"fields": "list"})
+        assert "course_description" not in res.json["data"][0]
+        assert res.json["data"][0]["id"] == 1
+        testapp.get("/tables", {"fields": "everything"}, status=400)
+
+
+class TestFeedbackListing:
+    """Streamed feedback listing."""
+
+    def _seed(self, db):
+        course = CourseFactory()
+        users = UserFactory.create_batch(3)
+        db.session.flush()
+        for user in users:
+            FeedbackFactory(course_id=course.id, user_id=user.id)
+        db.session.commit()
+        return course, users
+
+    def test_feedbacks_streams_json_array(self, db, testapp):
+        """Default mode is a JSON array spanning several batches."""
+        course, users = self._seed(db)
+        res = testapp.get("/feedbacks")
+        assert res.content_type == "application/json"
+        assert [row["username"] for row in res.json] == [u.username for u in users]
+        assert all(row["course_name"] == course.course_name for row in res.json)
+
+    def test_feedbacks_streams_ndjson(self, db, testapp):
+        """NDJSON mode emits one object per line."""
+        _, users = self._seed(db)
+        res = testapp.get("/feedbacks", {"format": "ndjson"})
+        assert res.content_type == "application/x-ndjson"
+        rows = [json.loads(line) for line in res.text.splitlines()]
+        assert [row["username"] for row in rows] == [u.username for u in users]
+
+    def test_feedbacks_empty(self, db, testapp):
+        """No feedback yields an empty array."""
+        assert testapp.get("/feedbacks").json == []
+
+
+class TestDashboard:
+    """Dashboard endpoints."""
+
+    def test_summary(self, user, testapp):
+        """Summary reports the maintained counters."""
+        CourseFactory.create_batch(4)
+        FeedbackFactory(course_id=1, user_id=user.id)
+        user.save()
+        res = testapp.get("/dashboard/summary")
+        assert res.json["courses_number"] == 4
+        assert res.json["feedback_number"] == 1
+        assert res.json["users"] == 1
+        assert res.json["comment_rate"] == "25.00%"
+
+    def test_summary_cached_until_commit(self, db, testapp):
+        """Summary is served from cache until a commit changes a course."""
+        CourseFactory()
+        db.session.commit()
+        assert testapp.get("/dashboard/summary").json["courses_number"] == 1
+
+        # Raw SQL bypasses the session events, so the cached body is served.
+        db.session.execute(text("update statistics set course_count = 42"))
+        db.session.commit()
+        assert testapp.get("/dashboard/summary").json["courses_number"] == 1
+
+        CourseFactory()
+        db.session.commit()
+        assert testapp.get("/dashboard/summary").json["courses_number"] == 43
+
+    def test_barchart_counts_feedback_per_course(self, db, testapp):
+        """The top courses are ranked by feedback count."""
+        popular, quiet = CourseFactory.create_batch(2)
+        users = UserFactory.create_batch(3)
+        db.session.flush()
+        for user, course in zip(users, [popular, popular, quiet]):
+            FeedbackFactory(course_id=course.id, user_id=user.id)
+        db.session.commit()
+        res = testapp.get("/dashboard/barchart")
+        assert res.json == [
+            {
+                "course_id": popular.id,
+                "course_name": popular.course_name,
+                "feedback_num": 2,
+            },
+            {
+                "course_id": quiet.id,
+                "course_name": quiet.course_name,
+                "feedback_num": 1,
+            },
+        ]
+
+    def test_bundle(self, db, user, testapp):
+        """The bundle carries every section in one tagged response."""
+        course = CourseFactory(course_type=1)
+        CourseFactory(course_type=1)
+        CourseFactory(course_type=2)
+        db.session.flush()
+        FeedbackFactory(course_id=course.id, user_id=user.id)
+        db.session.commit()
+        res = testapp.get("/dashboard/bundle")
+        assert res.json["summary"]["courses_number"] == 3
+        assert res.json["barchart"][0]["course_id"] == course.id
+        assert sorted(
+            (row["course_type"], row["course_type_num"]) for row in res.json["piechart"]
+        ) == [(1, 2), (2, 1)]
+        assert "errors" not in res.json
+        assert res.headers["ETag"]
+
+    def test_bundle_cached_until_commit(self, db, testapp, monkeypatch):
+        """Complete bundles are served from cache until their tables change."""
+        calls = []
+        summary = dashboard.SECTIONS["summary"]
+
+        def counted(connection):
+            calls.append(1)
+            return summary(connection)
+
+        monkeypatch.setitem(dashboard.SECTIONS, "summary", counted)
+        testapp.get("/dashboard/bundle")
+        testapp.get("/dashboard/bundle")
+        assert len(calls) == 1
+        CourseFactory()
+        db.session.commit()
+        res = testapp.get("/dashboard/bundle")
+        assert len(calls) == 2
+        assert res.json["summary"]["courses_number"] == 1
+
+    def test_bundle_section_timeout(self, app, db, testapp, monkeypatch):
+        """A slow or failing section is reported without holding back the others."""
+
+        def slow(connection):
+            time.sleep(0.5)
+            return []
+
+        def broken(connection):
+            raise RuntimeError("boom")
+
+        monkeypatch.setitem(dashboard.SECTIONS, "barchart", slow)
+        monkeypatch.setitem(dashboard.SECTIONS, "piechart", broken)
+        monkeypatch.setitem(app.config, "DASHBOARD_SECTION_TIMEOUT", 0.1)
+        started = time.monotonic()
+        res = testapp.get("/dashboard/bundle")
+        assert time.monotonic() - started < 0.5
+        assert res.json["summary"]["courses_number"] == 0
+        assert res.json["errors"] == {"barchart": "timeout", "piechart": "failed"}
+        assert "ETag" not in res.headers
+        assert res.cache_control.no_store
+        # Partial bundles are not cached, the next request tries again.
+        monkeypatch.setitem(dashboard.SECTIONS, "barchart", lambda connection: [])
+        monkeypatch.setitem(dashboard.SECTIONS, "piechart", lambda connection: [])
+        assert "errors" not in testapp.get("/dashboard/bundle").json
+
+
+class TestConditionalGet:
+    """ETag revalidation of data endpoints."""
+
+    def test_not_modified_until_write(self, db, testapp):
+        """A matching If-None-Match gets 304 until the table changes."""
+        CourseFactory()
+        db.session.commit()
+        res = testapp.get("/tables")
+        etag = res.headers["ETag"]
+        assert etag.startswith('W/"')
+
+        res = testapp.get("/tables", headers={"If-None-Match": etag}, status=304)
+        assert res.body == b""
+        assert res.headers["ETag"] == etag
+
+        CourseFactory()
+        db.session.commit()
+        res = testapp.get("/tables", headers={"If-None-Match": etag})
+        assert res.status_code == 200
+        assert res.headers["ETag"] != etag
+
+    def test_etag_depends_on_query(self, db, testapp):
+        """Different pages of the same data set have different ETags."""
+        first = testapp.get("/tables", {"limit": 1}).headers["ETag"]
+        second = testapp.get("/tables", {"limit": 2}).headers["ETag"]
+        assert first != second
+
+    def test_unrelated_write_keeps_etag(self, user, testapp):
+        """Writes to other tables do not change the ETag."""
+        etag = testapp.get("/tables").headers["ETag"]
+        user.update(first_name="Changed")
+        testapp.get("/tables", headers={"If-None-Match": etag}, status=304)
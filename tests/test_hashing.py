@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""Password hashing pool tests."""
+import threading
+
+import pytest
+
+from my_flask_app.extensions import bcrypt
+from my_flask_app.hashing import PasswordHasherBusy, password_hasher
+from my_flask_app.public.forms import BUSY_MESSAGE, LoginForm
+
+
+@pytest.fixture
+def full_hasher(app, monkeypatch):
+    """Block the only hashing slot until the test is over."""
+    monkeypatch.setattr(password_hasher, "pool_size", 1)
+    monkeypatch.setattr(password_hasher, "queue_limit", 0)
+    password_hasher.close()
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_hash(password):
+        started.set()
+        release.wait()
+        return b""
+
+    monkeypatch.setattr(bcrypt, "generate_password_hash", slow_hash)
+    worker = threading.Thread(
+        target=password_hasher.generate_password_hash, args=("x",)
+    )
+    worker.start()
+    started.wait()
+    yield password_hasher
+    release.set()
+    worker.join()
+    password_hasher.close()
+
+
+class TestPasswordHasher:
+    """PasswordHasher."""
+
+    def test_round_trip(self, app):
+        """Hashes made on the pool verify on the pool."""
+        pw_hash = password_hasher.generate_password_hash("secret")
+        assert password_hasher.check_password_hash(pw_hash, "secret") is True
+        assert password_hasher.check_password_hash(pw_hash, "wrong") is False
+
+    def test_rejects_when_queue_is_full(self, full_hasher):
+        """Callers beyond the pool and queue limit are turned away."""
+        with pytest.raises(PasswordHasherBusy):
+            full_hasher.check_password_hash(b"hash", "secret")
+
+    def test_login_form_reports_busy(self, user, full_hasher):
+        """A busy hasher fails login validation with a retry message."""
+        form = LoginForm(username=user.username, password="myprecious")
+        assert form.validate() is False
+        assert BUSY_MESSAGE in form.password.errors
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""User identity cache tests."""
+import pytest
+
+from my_flask_app.user.identity import user_identities
+
+from .factories import UserFactory
+
+
+@pytest.mark.usefixtures("db")
+class TestIdentityCache:
+    """IdentityCache."""
+
+    def test_hit_after_miss(self, user):
+        """Only the first lookup selects the user."""
+        first = user_identities.get(str(user.id))
+        second = user_identities.get(user.id)
+        assert first is second
+        assert first.username == user.username
+        assert first.is_authenticated and first.is_active
+        assert user_identities.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    def test_update_evicts(self, user):
+        """Updating the user drops the cached identity."""
+        user_identities.get(user.id)
+        user.update(active=False)
+        identity = user_identities.get(user.id)
+        assert identity.is_active is False
+        assert user_identities.misses == 2
+
+    def test_delete_evicts(self, user):
+        """Deleted users are no longer loaded."""
+        user_identities.get(user.id)
+        user.delete()
+        assert user_identities.get(user.id) is None
+
+    def test_ttl_expires(self, user, monkeypatch):
+        """Entries are reloaded once their TTL elapsed."""
+        monkeypatch.setattr(user_identities, "ttl", 0)
+        user_identities.get(user.id)
+        user_identities.get(user.id)
+        assert user_identities.misses == 2
+
+    def test_lru_eviction(self, db, monkeypatch):
+        """The least recently used identity goes first."""
+        monkeypatch.setattr(user_identities, "maxsize", 2)
+        first, second, third = UserFactory.create_batch(3)
+        db.session.commit()
+        for user in (first, second, first, third):
+            user_identities.get(user.id)
+        assert user_identities.stats()["size"] == 2
+        user_identities.get(first.id)
+        assert user_identities.hits == 2
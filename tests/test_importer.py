@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""Course catalog importer tests."""
+import io
+import json
+
+import pytest
+
+from my_flask_app import importer, search
+from my_flask_app.user.models import Course, Feedback, Statistics
+
+from .factories import UserFactory
+
+
+def course_record(code, name="Algorithms", semester="Fall"):
+    """Build a raw catalog record."""
+    return {"course_name": name, "course_code": code, "semester": semester}
+
+
+class TestIterRecords:
+    """Streaming record parsers."""
+
+    def test_json_array_across_chunks(self, monkeypatch):
+        """Objects split over read boundaries are reassembled."""
+        monkeypatch.setattr(importer, "_CHUNK_SIZE", 7)
+        records = [course_record(f"C{n}") for n in range(5)]
+        parsed = importer.iter_records(io.StringIO(json.dumps(records)), "json")
+        assert list(parsed) == records
+
+    def test_json_requires_array(self):
+        """A top-level object is rejected."""
+        with pytest.raises(importer.InvalidRecord):
+            list(importer.iter_records(io.StringIO("{}"), "json"))
+
+    def test_json_truncated(self):
+        """A missing closing bracket ends the records with an error."""
+        records = [course_record("C1"), course_record("C2")]
+        source = io.StringIO(json.dumps(records)[:-5])
+        first, error = importer.iter_records(source, "json")
+        assert first == records[0]
+        assert isinstance(error, importer.InvalidRecord)
+
+    def test_ndjson_malformed_line(self):
+        """A line that is not JSON comes out as an error naming the line."""
+        source = io.StringIO('{"course_code": "C1"}\n\n{"course_code": \n{}\n')
+        first, error, last = importer.iter_records(source, "ndjson")
+        assert (first, last) == ({"course_code": "C1"}, {})
+        assert str(error).startswith("line 3 is not valid JSON")
+
+    def test_csv(self):
+        """CSV rows come out as dictionaries."""
+        source = io.StringIO("course_name,course_code,semester\nAlgo,C1,Fall\n")
+        assert list(importer.iter_records(source, "csv")) == [
+            course_record("C1", name="Algo")
+        ]
+
+
+class TestValidateCourse:
+    """Record validation."""
+
+    def test_strips_and_fills_optional_fields(self):
+        """Whitespace is trimmed and missing optional fields become None."""
+        row = importer.validate_course(course_record(" C1 "))
+        assert row["course_code"] == "C1"
+        assert row["course_description"] is None
+
+    @pytest.mark.parametrize(
+        "record",
+        [
+            {"course_name": "Algo", "semester": "Fall"},
+            course_record("C1", name=""),
+            course_record("C" * 300),
+            ["not", "an", "object"],
+        ],
+    )
+    def test_rejects(self, record):
+        """Missing, empty and oversized fields are rejected."""
+        with pytest.raises(importer.InvalidRecord):
+            importer.validate_course(record)
+
+
+class TestImportCoursesCommand:
+    """flask import-courses."""
+
+    def test_upserts_on_course_code(self, app, db, tmp_path):
+        """Existing codes are updated, new ones inserted, bad rows skipped."""
+        course = Course.create(
+            course_name="Old name", course_code="C1", semester="Fall"
+        )
+        user = UserFactory()
+        db.session.flush()
+        Feedback.create(course_id=course.id, user_id=user.id, feedback="Great")
+        source = tmp_path / "catalog.ndjson"
+        source.write_text(
+            "\n".join(
+                json.dumps(record)
+                for record in [
+                    course_record("C1", name="New name"),
+                    course_record("C2"),
+                    course_record("C3", semester=""),
+                    course_record("C4"),
+                ]
+            )
+        )
+        result = app.test_cli_runner().invoke(
+            args=["import-courses", str(source), "--batch-size", "2"]
+        )
+        assert result.exit_code == 0, result.output
+        assert "Imported 3 courses, skipped 1 invalid records" in result.output
+        db.session.expire_all()
+        assert Course.query.filter_by(course_code="C1").one().course_name == "New name"
+        assert Course.query.count() == 3
+        assert Statistics.current()["course_count"] == 3
+        assert Feedback.query.one().course_name == "New name"
+        assert len(search.search("new", kinds=["course"])[0]) == 1
+
+    def test_skips_malformed_line(self, app, db, tmp_path):
+        """A line that is not JSON is reported and the rest imported."""
+        source = tmp_path / "catalog.ndjson"
+        source.write_text(
+            "\n".join(
+                [
+                    json.dumps(course_record("C1")),
+                    '{"course_code": "C2",',
+                    json.dumps(course_record("C3")),
+                ]
+            )
+        )
+        result = app.test_cli_runner().invoke(args=["import-courses", str(source)])
+        assert result.exit_code == 0, result.output
+        assert "Skipping record 2: line 2 is not valid JSON" in result.output
+        assert "Imported 2 courses, skipped 1 invalid records" in result.output
+
+    def test_unknown_extension(self, app, db, tmp_path):
+        """The format must be given when it cannot be guessed."""
+        source = tmp_path / "catalog.txt"
+        source.write_text("")
+        result = app.test_cli_runner().invoke(args=["import-courses", str(source)])
+        assert result.exit_code != 0
+        assert "--format" in result.output
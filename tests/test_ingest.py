@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""Feedback ingestion tests."""
+import os
+
+import pytest
+from sqlalchemy import text
+
+from my_flask_app import search
+from my_flask_app.ingest import (
+    ACTIVE_NAME,
+    QUARANTINE_SUFFIX,
+    SpoolCheckpoint,
+    feedback_ingest,
+)
+from my_flask_app.user.models import CourseFeedbackCount, Feedback, Statistics
+
+from .factories import CourseFactory, UserFactory
+
+
+@pytest.fixture
+def spool(app, tmp_path):
+    """Point the feedback spool at a temporary directory."""
+    spool = app.extensions["feedback_ingest"]
+    spool.directory = str(tmp_path)
+    return spool
+
+
+@pytest.fixture
+def course(db):
+    """Create a course to submit feedback for."""
+    course = CourseFactory(course_name="Databases")
+    db.session.commit()
+    return course
+
+
+def submission(username, course_name="Databases", feedback="Great course"):
+    """Build a feedback payload as sent by feedback.html."""
+    return {"course_name": course_name, "username": username, "feedback": feedback}
+
+
+class TestSubmitFeedback:
+    """Feedback submission endpoint."""
+
+    def test_submit_spools_and_acknowledges(self, spool, course, testapp):
+        """Submissions are acknowledged before they reach the database."""
+        res = testapp.post_json("/feedback/submit/", submission("alice"))
+        assert res.status_code == 202
+        assert os.path.getsize(os.path.join(spool.directory, ACTIVE_NAME)) > 0
+        assert Feedback.query.count() == 0
+
+    def test_submit_rejects_missing_fields(self, spool, db, testapp):
+        """Incomplete payloads are rejected without spooling."""
+        res = testapp.post_json(
+            "/feedback/submit/", {"course_name": "Databases"}, status=400
+        )
+        assert "required" in res.json["message"]
+        assert not os.path.exists(os.path.join(spool.directory, ACTIVE_NAME))
+
+
+class TestDrain:
+    """Spool draining."""
+
+    def test_drain_commits_in_batches(self, spool, course, db):
+        """Every resolvable submission is inserted and counted."""
+        users = UserFactory.create_batch(5)
+        db.session.commit()
+        for user in users:
+            feedback_ingest.submit(submission(user.username))
+        feedback_ingest.submit(submission("nobody"))
+
+        assert feedback_ingest.drain() == 5
+        assert {f.username for f in Feedback.query} == {u.username for u in users}
+        assert {f.course_id for f in Feedback.query} == {course.id}
+        assert Statistics.current()["feedback_count"] == 5
+        assert CourseFeedbackCount.top()[0]["feedback_num"] == 5
+        assert sorted(os.listdir(spool.directory)) == ["append.lock", "drain.lock"]
+
+    def test_drain_skips_second_feedback_from_user(self, spool, course, user, db):
+        """Users can only leave one feedback."""
+        feedback_ingest.submit(submission(user.username, feedback="first"))
+        feedback_ingest.submit(submission(user.username, feedback="second"))
+        assert feedback_ingest.drain() == 1
+        assert Feedback.query.one().feedback == "first"
+
+    def test_drained_feedback_is_searchable(self, spool, course, user, db):
+        """Bulk inserted feedback is added to the search index."""
+        feedback_ingest.submit(submission(user.username, feedback="loved the labs"))
+        feedback_ingest.drain()
+        (hit,) = search.search("labs")[0]
+        assert hit["type"] == "feedback"
+        assert hit["title"] == "Databases"
+
+    def test_drain_without_search_table(self, spool, course, user, db):
+        """A database predating the search index gets it on the first drain."""
+        db.session.execute(text("DROP TABLE feedback_search"))
+        db.session.commit()
+        search.indexes["feedback"]._ready.clear()
+        feedback_ingest.submit(submission(user.username, feedback="loved the labs"))
+        assert feedback_ingest.drain() == 1
+        assert len(search.search("labs")[0]) == 1
+
+    def test_drain_resumes_from_checkpoint(self, spool, course, db):
+        """A crash after committing part of a segment replays only the rest."""
+        users = UserFactory.create_batch(3)
+        db.session.commit()
+        for user in users:
+            feedback_ingest.submit(submission(user.username))
+        spool._rotate()
+        (segment,) = [n for n in os.listdir(spool.directory) if n.endswith("segment")]
+        with open(os.path.join(spool.directory, segment), "rb") as spool_file:
+            first_line = spool_file.readline()
+        # The first line was committed before the crash.
+        Feedback.create(
+            course_id=course.id, user_id=users[0].id, username=users[0].username
+        )
+        db.session.add(
+            SpoolCheckpoint(spool="feedback", segment=segment, offset=len(first_line))
+        )
+        db.session.commit()
+
+        assert feedback_ingest.drain() == 2
+        assert Feedback.query.count() == 3
+
+    def test_drain_ignores_torn_line(self, spool, course, user, db):
+        """A partially written last line is dropped."""
+        feedback_ingest.submit(submission(user.username))
+        with open(os.path.join(spool.directory, ACTIVE_NAME), "ab") as spool_file:
+            spool_file.write(b'{"course_name": "Datab')
+        assert feedback_ingest.drain() == 1
+
+    def test_append_truncates_torn_line(self, spool, course, user, db):
+        """A submission is not glued to a line torn by an earlier crash."""
+        os.makedirs(spool.directory, exist_ok=True)
+        with open(os.path.join(spool.directory, ACTIVE_NAME), "wb") as spool_file:
+            spool_file.write(b'{"course_name": "Datab')
+        feedback_ingest.submit(submission(user.username))
+        assert feedback_ingest.drain() == 1
+        assert Feedback.query.one().username == user.username
+
+    def test_failing_batch_is_quarantined(self, spool, course, db, monkeypatch):
+        """A batch that keeps failing is set aside after the allowed attempts."""
+        users = UserFactory.create_batch(3)
+        db.session.commit()
+        for user in users:
+            feedback_ingest.submit(submission(user.username))
+        resolve = spool._resolve
+
+        def failing(records):
+            if any(r["username"] == users[0].username for r in records):
+                raise RuntimeError("cannot insert")
+            return resolve(records)
+
+        monkeypatch.setattr(spool, "_resolve", failing)
+        for _ in range(spool.max_attempts):
+            with pytest.raises(RuntimeError):
+                feedback_ingest.drain()
+            db.session.rollback()
+
+        assert feedback_ingest.drain() == 1
+        assert Feedback.query.one().username == users[2].username
+        (quarantined,) = [
+            n for n in os.listdir(spool.directory) if n.endswith(QUARANTINE_SUFFIX)
+        ]
+        with open(os.path.join(spool.directory, quarantined), "rb") as batch:
+            assert batch.read().count(b"\n") == 2
+
+
+class TestResume:
+    """Draining what a previous process left in the spool."""
+
+    def test_resume_starts_writer_for_backlog(self, spool, monkeypatch):
+        """The writer starts when the spool holds submissions."""
+        started = []
+        monkeypatch.setattr(spool, "start_writer", lambda: started.append(1))
+        spool.resume()
+        assert not started
+        with open(os.path.join(spool.directory, "1.segment"), "wb") as segment:
+            segment.write(b"{}\n")
+        spool.resume()
+        assert started == [1]
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""JSON provider tests."""
+import datetime as dt
+import decimal
+
+import pytest
+
+from my_flask_app.json_provider import FastJSONProvider
+
+from .factories import UserFactory
+
+PAYLOAD = {
+    "when": dt.datetime(2024, 5, 17, 8, 30, 15, 250),
+    "day": dt.date(2024, 5, 17),
+    "blob": b"caf\xc3\xa9",
+    "price": decimal.Decimal("9.50"),
+    "nested": [1, 2.5, None, True, {"text": "x"}],
+}
+EXPECTED = {
+    "when": "2024-05-17T08:30:15.000250",
+    "day": "2024-05-17",
+    "blob": "café",
+    "price": "9.50",
+    "nested": [1, 2.5, None, True, {"text": "x"}],
+}
+
+
+@pytest.fixture(params=[True, False], ids=["orjson", "stdlib"])
+def provider(app, request):
+    """The app's provider with either encoder."""
+    provider = FastJSONProvider(app)
+    provider.fast = request.param
+    return provider
+
+
+class TestFastJSONProvider:
+    """FastJSONProvider."""
+
+    def test_installed_on_app(self, app):
+        """create_app installs the provider."""
+        assert isinstance(app.json, FastJSONProvider)
+
+    def test_converts_values(self, provider):
+        """Datetimes, bytes and decimals need no pre-conversion."""
+        assert provider.loads(provider.dumps(PAYLOAD)) == EXPECTED
+
+    def test_encoders_agree(self, app):
+        """Both encoders produce the same compact document."""
+        fast, slow = FastJSONProvider(app), FastJSONProvider(app)
+        slow.fast = False
+        assert fast.dumps_bytes(EXPECTED) == slow.dumps_bytes(EXPECTED)
+
+    def test_row_mappings(self, db, provider):
+        """Rows and row mappings serialize as objects."""
+        user = UserFactory(username="jsonrows")
+        db.session.commit()
+        query = db.select(db.text("id, username")).select_from(db.text("users"))
+        mappings = db.session.execute(query).mappings().all()
+        rows = db.session.execute(query).all()
+        expected = [{"id": user.id, "username": "jsonrows"}]
+        assert provider.loads(provider.dumps(mappings)) == expected
+        assert provider.loads(provider.dumps(rows)) == expected
+
+    def test_unknown_types_fail(self, provider):
+        """Values without a conversion raise TypeError."""
+        with pytest.raises(TypeError):
+            provider.dumps({"value": object()})
+
+    def test_jsonify(self, app):
+        """``jsonify`` responses go through the provider."""
+        response = app.json.response({"when": PAYLOAD["when"]})
+        assert response.mimetype == "application/json"
+        assert response.get_json() == {"when": EXPECTED["when"]}
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Structured logging tests."""
+import io
+import json
+import logging
+
+from my_flask_app.logs import AsyncJsonHandler, SamplingFilter, truncate
+
+
+def make_record(name="my_flask_app", level=logging.INFO, msg="hello", **extra):
+    """Build a log record as ``Logger.info`` would."""
+    record = logging.LogRecord(name, level, __file__, 1, msg, (), None)
+    record.__dict__.update(extra)
+    return record
+
+
+class TestSamplingFilter:
+    """Per-logger sampling."""
+
+    def test_most_specific_rate_applies(self):
+        """A logger inherits the rate of its nearest configured ancestor."""
+        sampling = SamplingFilter({"my_flask_app": 0.5, "my_flask_app.public": 0})
+        assert sampling.rate("my_flask_app.public.views") == 0
+        assert sampling.rate("my_flask_app.user") == 0.5
+        assert sampling.rate("werkzeug") == 1.0
+
+    def test_warnings_are_never_sampled(self):
+        """Records at WARNING and above always pass."""
+        sampling = SamplingFilter({"my_flask_app": 0})
+        assert not sampling.filter(make_record())
+        assert sampling.filter(make_record(level=logging.WARNING))
+
+
+class TestAsyncJsonHandler:
+    """Queued JSON handler."""
+
+    def test_writes_json_lines(self):
+        """Queued records come out as one JSON object per line."""
+        stream = io.StringIO()
+        handler = AsyncJsonHandler(stream=stream)
+        handler.handle(make_record(msg="first", course_id=7))
+        handler.handle(make_record(msg="second"))
+        handler.close()
+        first, second = map(json.loads, stream.getvalue().splitlines())
+        assert first["message"] == "first"
+        assert first["level"] == "INFO"
+        assert first["course_id"] == 7
+        assert second["message"] == "second"
+
+    def test_payloads_are_truncated(self):
+        """Long messages and extra fields are cut to ``max_length``."""
+        stream = io.StringIO()
+        handler = AsyncJsonHandler(stream=stream, max_length=10)
+        handler.handle(make_record(msg="x" * 100, payload=list(range(100))))
+        handler.close()
+        entry = json.loads(stream.getvalue())
+        assert entry["message"] == truncate("x" * 100, 10)
+        assert entry["message"].startswith("x" * 10 + "...")
+        assert len(entry["payload"]) < 50
+
+    def test_full_queue_drops_and_reports(self):
+        """Records past ``queue_size`` are counted and reported, not queued."""
+        stream = io.StringIO()
+        handler = AsyncJsonHandler(stream=stream, queue_size=2)
+        handler._ensure_writer = lambda: None  # Keep the records queued
+        for number in range(5):
+            handler.handle(make_record(msg=str(number)))
+        handler.flush()
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert lines[0]["message"] == "Dropped 3 log records"
+        assert [line["message"] for line in lines[1:]] == ["0", "1"]
+
+    def test_request_context_is_recorded(self, app):
+        """Records logged during a request carry its method and path."""
+        stream = io.StringIO()
+        handler = AsyncJsonHandler(stream=stream)
+        with app.test_request_context("/tables", method="GET"):
+            handler.handle(make_record())
+        handler.close()
+        entry = json.loads(stream.getvalue())
+        assert entry["path"] == "/tables"
+        assert entry["method"] == "GET"
+
+    def test_configured_on_app_logger(self, app):
+        """The app logger writes through a single asynchronous handler."""
+        handlers = [h for h in app.logger.handlers if isinstance(h, AsyncJsonHandler)]
+        assert len(handlers) == 1
+        assert len(app.logger.handlers) == 1
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Request metrics tests."""
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from .factories import CourseFactory
+
+
+def sample(name, **labels):
+    """Current value of a sample in the default registry, 0 if absent."""
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class TestMetrics:
+    """Metrics extension."""
+
+    def test_request_is_timed_and_counted(self, db, testapp):
+        """A request adds a latency observation and a status count."""
+        labels = {"endpoint": "public.tables", "method": "GET"}
+        before = sample("http_request_duration_seconds_count", **labels)
+        requests = sample("http_requests_total", status="200", **labels)
+        testapp.get("/tables")
+        assert sample("http_request_duration_seconds_count", **labels) == before + 1
+        assert sample("http_requests_total", status="200", **labels) == requests + 1
+
+    def test_sql_usage_is_recorded(self, db, testapp):
+        """Statements executed by the view are counted per request."""
+        CourseFactory.create_batch(3)
+        db.session.commit()
+        before = sample("http_request_sql_queries_sum", endpoint="public.tables")
+        testapp.get("/tables")
+        after = sample("http_request_sql_queries_sum", endpoint="public.tables")
+        assert after > before
+        assert sample(
+            "http_request_sql_duration_seconds_count", endpoint="public.tables"
+        )
+
+    def test_failed_statement_stops_its_timer(self, db):
+        """A statement raising an error leaves no start time on the connection."""
+        connection = db.session.connection()
+        with pytest.raises(OperationalError):
+            connection.execute(text("SELECT * FROM no_such_table"))
+        assert connection.info["metrics_query_start"] == []
+
+    def test_unmatched_urls_share_a_label(self, db, testapp):
+        """404s do not create one label per requested path."""
+        labels = {"endpoint": "<unmatched>", "method": "GET", "status": "404"}
+        before = sample("http_requests_total", **labels)
+        testapp.get("/no/such/page", status=404)
+        testapp.get("/another/missing", status=404)
+        assert sample("http_requests_total", **labels) == before + 2
+
+    def test_exposition(self, db, testapp):
+        """``/metrics`` serves the text exposition format."""
+        testapp.get("/tables")
+        res = testapp.get("/metrics")
+        assert res.content_type == "text/plain"
+        assert (
+            'http_request_duration_seconds_bucket{endpoint="public.tables"' in res.text
+        )
+        assert "http_request_sql_queries_count" in res.text
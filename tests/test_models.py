@@ -4,9 +4,16 @@ import datetime as dt
 
 import pytest
 
-from my_flask_app.user.models import Role, User
+from my_flask_app.user.models import (
+    Course,
+    CourseFeedbackCount,
+    Feedback,
+    Role,
+    Statistics,
+    User,
+)
 
-from .factories import UserFactory
+from .factories import CourseFactory, FeedbackFactory, UserFactory
 
 
 @pytest.mark.usefixtures("db")
@@ -74,3 +81,164 @@ class TestUser:
         """Check __repr__ output for User."""
         user = User(username="foo", email="foo@bar.com")
         assert user.__repr__() == "<User('foo')>"
+
+
+@pytest.mark.usefixtures("db")
+class TestCourse:
+    """Course tests."""
+
+    def test_paginate_after(self, db):
+        """Walk every course page by page using the returned cursor."""
+        CourseFactory.create_batch(5)
+        db.session.commit()
+
+        page, cursor = Course.paginate_after(limit=2)
+        assert [course.id for course in page] == [1, 2]
+        assert cursor == 2
+
+        page, cursor = Course.paginate_after(after=cursor, limit=2)
+        assert [course.id for course in page] == [3, 4]
+
+        page, cursor = Course.paginate_after(after=cursor, limit=2)
+        assert [course.id for course in page] == [5]
+        assert cursor is None
+
+    def test_field_sets(self):
+        """``detail`` covers every column, named sets only theirs."""
+        assert "course_description" in Course.field_names()
+        assert "course_description" not in Course.field_names("list")
+        with pytest.raises(KeyError):
+            Course.field_names("missing")
+
+    def test_select_fields_returns_rows(self, db):
+        """Projected queries return rows, not tracked instances."""
+        course = CourseFactory(course_description="x" * 100)
+        db.session.commit()
+        expected = course.to_dict("list")
+        db.session.expunge_all()
+        row = db.session.execute(Course.select_fields("list")).one()
+        assert row._mapping == expected
+        assert not db.session.identity_map
+
+    def test_paginate_after_fields(self, db):
+        """Pages of rows carry the same cursor as pages of instances."""
+        CourseFactory.create_batch(3)
+        db.session.commit()
+        rows, next_cursor = Course.paginate_after(limit=2, fields="list")
+        assert [row.id for row in rows] == [1, 2]
+        assert next_cursor == 2
+
+    def test_paginate_after_fields_keeps_query_filters(self, db):
+        """A projected page still applies the caller's filters."""
+        CourseFactory.create_batch(2, semester="Fall")
+        spring = CourseFactory(semester="Spring")
+        db.session.commit()
+        rows, next_cursor = Course.paginate_after(
+            query=Course.query.filter_by(semester="Spring"), fields="list"
+        )
+        assert [row.id for row in rows] == [spring.id]
+        assert rows[0]._mapping["semester"] == "Spring"
+        assert next_cursor is None
+
+    def test_to_dict(self, db):
+        """Instances serialize through the same field sets."""
+        course = CourseFactory()
+        db.session.commit()
+        assert set(course.to_dict()) == set(Course.field_names())
+        assert set(course.to_dict("list")) == set(Course.field_names("list"))
+
+
+@pytest.mark.usefixtures("db")
+class TestStatistics:
+    """Statistics tests."""
+
+    def test_empty(self):
+        """No statistics row reads as all zeroes."""
+        assert Statistics.current() == {
+            "course_count": 0,
+            "feedback_count": 0,
+            "user_count": 0,
+        }
+
+    def test_counts_follow_inserts_and_deletes(self, db):
+        """Mapper hooks keep the counters in step with writes."""
+        user = UserFactory()
+        CourseFactory.create_batch(2)
+        db.session.commit()
+        FeedbackFactory(course_id=1, user_id=user.id)
+        db.session.commit()
+        assert Statistics.current() == {
+            "course_count": 2,
+            "feedback_count": 1,
+            "user_count": 1,
+        }
+
+        Course.get_by_id(1).delete()
+        assert Statistics.current()["course_count"] == 1
+
+    def test_bump_creates_row(self, db):
+        """Bumping creates the counters row, never below zero, then adds to it."""
+        Statistics.bump(db.session.connection(), "user_count", -1)
+        assert Statistics.current()["user_count"] == 0
+        Statistics.bump(db.session.connection(), "user_count", 2)
+        Statistics.bump(db.session.connection(), "user_count", 3)
+        assert Statistics.current()["user_count"] == 5
+
+    def test_reconcile(self, db):
+        """Reconcile repairs counters after a bulk delete bypassed the hooks."""
+        CourseFactory.create_batch(3)
+        db.session.commit()
+        Course.query.filter(Course.id > 1).delete()
+        db.session.commit()
+        assert Statistics.current()["course_count"] == 3
+
+        stats = Statistics.reconcile()
+        assert stats.course_count == 1
+        assert Statistics.current()["course_count"] == 1
+
+
+@pytest.mark.usefixtures("db")
+class TestCourseFeedbackCount:
+    """CourseFeedbackCount tests."""
+
+    def _seed(self, db, per_course):
+        courses = CourseFactory.create_batch(len(per_course))
+        users = UserFactory.create_batch(sum(per_course))
+        db.session.flush()
+        user_ids = iter(user.id for user in users)
+        for course, count in zip(courses, per_course):
+            for _ in range(count):
+                FeedbackFactory(course_id=course.id, user_id=next(user_ids))
+        db.session.commit()
+        return courses
+
+    def counts(self):
+        """Stored counts by course id."""
+        return {row.course_id: row.feedback_count for row in CourseFeedbackCount.query}
+
+    def test_top_ranks_by_count(self, db):
+        """The most discussed courses come first, up to ``limit``."""
+        courses = self._seed(db, [1, 3, 0, 2])
+        top = CourseFeedbackCount.top(2)
+        assert [row["course_id"] for row in top] == [courses[1].id, courses[3].id]
+        assert top[0]["course_name"] == courses[1].course_name
+        assert top[0]["feedback_num"] == 3
+
+    def test_follows_deletes_and_moves(self, db):
+        """Deleting or moving feedback adjusts both courses."""
+        first, second = self._seed(db, [2, 1])
+        feedback = Feedback.query.filter_by(course_id=first.id).first()
+        feedback.update(course_id=second.id)
+        assert self.counts() == {first.id: 1, second.id: 2}
+        Feedback.query.filter_by(course_id=second.id).first().delete()
+        assert self.counts() == {first.id: 1, second.id: 1}
+        first.delete()
+        assert self.counts() == {second.id: 1}
+
+    def test_reconcile(self, db):
+        """Reconciling recounts rows written behind the hooks' back."""
+        first, second = self._seed(db, [2, 1])
+        db.session.execute(db.delete(CourseFeedbackCount))
+        db.session.commit()
+        CourseFeedbackCount.reconcile()
+        assert self.counts() == {first.id: 2, second.id: 1}
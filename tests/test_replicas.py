@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""Read replica routing tests, with SQLite file copies as replicas."""
+import shutil
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import insert, select
+
+from my_flask_app.app import create_app
+from my_flask_app.database import db as _db
+from my_flask_app.user.models import Course
+
+from . import settings
+
+
+@pytest.fixture
+def replicated(tmp_path):
+    """An app with a primary and two replica SQLite files, all empty."""
+    primary = tmp_path / "primary.db"
+    config = {name: getattr(settings, name) for name in dir(settings) if name.isupper()}
+    config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{primary}"
+    config["SQLALCHEMY_REPLICA_URIS"] = [
+        f"sqlite:///{tmp_path / f'replica{number}.db'}" for number in range(2)
+    ]
+    app = create_app(SimpleNamespace(**config))
+
+    @app.route("/_write", methods=["POST"])
+    def write():
+        Course.create(course_name="Fresh", course_code="NEW", semester="Fall")
+        return "", 204
+
+    with app.app_context():
+        _db.create_all()
+        app.replicate = lambda *numbers: replicate(primary, tmp_path, *numbers)
+        app.replicate(0, 1)
+        yield app
+        _db.session.remove()
+        for engine in _db.engines.values():
+            engine.dispose()
+    # The metadata of each bind outlives the app; later apps have no replicas.
+    for key in [key for key in _db.metadatas if key is not None]:
+        del _db.metadatas[key]
+
+
+def replicate(primary, directory, *numbers):
+    """Copy the primary database over the given replicas."""
+    _db.session.commit()
+    for number in numbers:
+        _db.engines[f"replica_{number}"].dispose()
+        shutil.copyfile(primary, directory / f"replica{number}.db")
+
+
+def course_codes(client):
+    """Codes listed by ``/tables``."""
+    return [course["course_code"] for course in client.get("/tables").json["data"]]
+
+
+class TestReadReplicas:
+    """Replica routing."""
+
+    def test_reads_use_replicas_round_robin(self, replicated):
+        """Read-only views alternate between replicas, missing unreplicated rows."""
+        Course.create(course_name="Old", course_code="OLD", semester="Fall")
+        replicated.replicate(0)
+        client = replicated.test_client()
+        assert sorted([course_codes(client), course_codes(client)]) == [[], ["OLD"]]
+
+    def test_writes_use_primary(self, replicated):
+        """Within a replica view, only reads are routed to the replica."""
+        _db.session.info["replica"] = "replica_0"
+        try:
+            replica = _db.session.get_bind(clause=select(Course.id))
+            primary = _db.session.get_bind(clause=insert(Course))
+        finally:
+            _db.session.info.pop("replica")
+        assert replica is _db.engines["replica_0"]
+        assert primary is _db.engines[None]
+
+    def test_reads_own_writes(self, replicated):
+        """A client that committed reads the primary for a while."""
+        client = replicated.test_client()
+        assert course_codes(client) == []
+        client.post("/_write")
+        assert course_codes(client) == ["NEW"]
+        assert course_codes(client) == ["NEW"]
+        assert course_codes(replicated.test_client()) == []
+
+    def test_window_expires(self, replicated):
+        """Once the window has passed, reads return to the replicas."""
+        replicated.config["REPLICA_READ_YOUR_WRITES"] = -1
+        client = replicated.test_client()
+        client.post("/_write")
+        assert course_codes(client) == []
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Full-text search tests."""
+import pytest
+from sqlalchemy import text
+
+from my_flask_app import search
+
+from .factories import CourseFactory, FeedbackFactory
+
+
+@pytest.mark.usefixtures("db")
+class TestSearchIndex:
+    """Search index maintenance."""
+
+    def test_insert_update_delete(self, db):
+        """Course writes are mirrored in the index."""
+        course = CourseFactory(course_description="Relational algebra and joins")
+        db.session.commit()
+        assert [hit["id"] for hit in search.search("algebra")[0]] == [course.id]
+
+        course.update(course_description="Query planning")
+        assert search.search("algebra")[0] == []
+        assert [hit["id"] for hit in search.search("planning")[0]] == [course.id]
+
+        course.delete()
+        assert search.search("planning")[0] == []
+
+    def test_rebuild(self, db):
+        """Rebuilding picks up rows written behind the hooks' back."""
+        db.session.execute(
+            text(
+                "insert into course (course_name, course_code, semester, "
+                "course_description) values ('Compilers', 'CSE401', 'Fall', "
+                "'Parsing and code generation')"
+            )
+        )
+        assert search.search("parsing")[0] == []
+        assert search.indexes["course"].rebuild(db.session.connection()) == 1
+        assert search.search("parsing")[0][0]["title"] == "Compilers"
+
+    def test_query_syntax_is_quoted(self, db):
+        """FTS5 operators in user input are treated as plain terms."""
+        CourseFactory(course_description='Graphs "NEAR" trees')
+        db.session.commit()
+        assert len(search.search('graphs" OR (')[0]) == 0
+        assert len(search.search("graphs NEAR")[0]) == 1
+
+    def test_paginates_across_kinds(self, db):
+        """Course and feedback hits are merged in rank order and paged."""
+        course = CourseFactory(course_description="machine learning")
+        db.session.commit()
+        FeedbackFactory(course_id=course.id, user_id=1, feedback="learning a lot")
+        FeedbackFactory(course_id=course.id, user_id=2, feedback="learning fast")
+        db.session.commit()
+
+        first, next_offset = search.search("learning", limit=2)
+        second, last_offset = search.search("learning", limit=2, offset=next_offset)
+        assert len(first) == 2 and len(second) == 1
+        assert last_offset is None
+        assert {hit["type"] for hit in first + second} == {"course", "feedback"}
+
+
+@pytest.mark.usefixtures("db")
+class TestMissingIndex:
+    """Databases created before the search tables existed."""
+
+    def drop(self, db, index):
+        """Drop the table of ``index`` as if it had never been created."""
+        db.session.execute(text(f"DROP TABLE {index.table}"))
+        index._ready.clear()
+
+    def test_first_write_creates_and_fills(self, db):
+        """A write recreates the table with existing rows and its own."""
+        old = CourseFactory(course_description="Legacy compilers")
+        db.session.commit()
+        self.drop(db, search.indexes["course"])
+        new = CourseFactory(course_description="Modern compilers")
+        db.session.commit()
+        hits = search.search("compilers", kinds=["course"])[0]
+        assert sorted(hit["id"] for hit in hits) == sorted([old.id, new.id])
+
+    def test_multi_row_flush(self, db):
+        """Rows of the flush that recreates the table are indexed once."""
+        self.drop(db, search.indexes["course"])
+        CourseFactory.create_batch(3, course_description="Distributed systems")
+        db.session.commit()
+        assert len(search.search("distributed", kinds=["course"])[0]) == 3
+
+    def test_update_and_delete(self, db):
+        """Updates and deletes also recreate the table."""
+        course = CourseFactory(course_description="Graph theory")
+        db.session.commit()
+        self.drop(db, search.indexes["course"])
+        course.update(course_description="Number theory")
+        assert [hit["id"] for hit in search.search("number")[0]] == [course.id]
+        self.drop(db, search.indexes["course"])
+        course.delete()
+        assert search.search("number")[0] == []
+
+    def test_search_unavailable(self, db):
+        """Searching a missing table raises instead of failing in SQL."""
+        self.drop(db, search.indexes["feedback"])
+        with pytest.raises(search.SearchUnavailable):
+            search.search("anything")
+
+
+class TestSearchEndpoint:
+    """Search endpoint."""
+
+    def test_snippets_are_highlighted_and_escaped(self, db, testapp):
+        """Matches are wrapped in <mark>, stored markup is escaped."""
+        CourseFactory(course_description="<b>Operating</b> systems and kernels")
+        db.session.commit()
+        res = testapp.get("/search", {"q": "kernels", "type": "course"})
+        (hit,) = res.json["data"]
+        assert "<mark>kernels</mark>" in hit["snippet"]
+        assert "&lt;b&gt;" in hit["snippet"]
+        assert res.json["next_offset"] is None
+
+    def test_missing_index(self, db, testapp):
+        """Without the search tables the endpoint answers 503."""
+        db.session.execute(text("DROP TABLE course_search"))
+        db.session.commit()
+        search.indexes["course"]._ready.clear()
+        res = testapp.get("/search", {"q": "x", "type": "course"}, status=503)
+        assert res.json["message"] == "Search is unavailable"
+
+    def test_unknown_type(self, db, testapp):
+        """Unknown hit types are rejected."""
+        testapp.get("/search", {"q": "x", "type": "users"}, status=400)
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""Cross-worker shared cache tests."""
+import multiprocessing
+import os
+import sqlite3
+import time
+
+import pytest
+from flask import Flask
+from flask_caching import Cache
+
+from my_flask_app import shared_cache
+from my_flask_app.shared_cache import (
+    SharedCache,
+    cache_path,
+    ensure_private,
+    remove_cache_files,
+)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """A shared cache in a temporary directory."""
+    return SharedCache(str(tmp_path / "cache.sqlite"))
+
+
+def _set_in_child(path):
+    SharedCache(path).set("from-child", {"pid": "child"})
+
+
+class TestSharedCache:
+    """Flask-Caching operations on the SQLite file."""
+
+    def test_set_get_delete(self, cache):
+        """Values round-trip through pickle and can be removed."""
+        assert cache.get("missing") is None
+        cache.set("key", {"a": [1, 2]})
+        assert cache.get("key") == {"a": [1, 2]}
+        assert cache.has("key")
+        assert cache.delete("key")
+        assert not cache.delete("key")
+        assert not cache.has("key")
+
+    def test_expiry(self, cache):
+        """Expired entries read as missing; a zero timeout never expires."""
+        cache.set("short", 1, timeout=1)
+        cache.set("forever", 2, timeout=0)
+        later = time.time() + 2
+        cache.set("probe", 3)
+        with pytest.MonkeyPatch.context() as patch:
+            patch.setattr("my_flask_app.shared_cache.time.time", lambda: later)
+            assert cache.get("short") is None
+            assert not cache.has("short")
+            assert cache.get("forever") == 2
+
+    def test_add_and_inc(self, cache):
+        """``add`` only stores new keys and ``inc``/``dec`` count atomically."""
+        assert cache.add("key", 1)
+        assert not cache.add("key", 2)
+        assert cache.get("key") == 1
+        assert cache.inc("counter") == 1
+        assert cache.inc("counter", 5) == 6
+        assert cache.dec("counter") == 5
+
+    def test_delete_many_and_clear(self, cache):
+        """``delete_many`` reports the keys that existed."""
+        cache.set_many({"a": 1, "b": 2, "c": 3})
+        assert cache.delete_many("a", "b", "missing") == ["a", "b"]
+        assert cache.get_many("a", "c") == [None, 3]
+        cache.clear()
+        assert cache.get("c") is None
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Past ``max_bytes`` the oldest entries go first."""
+        cache = SharedCache(str(tmp_path / "cache.sqlite"), max_bytes=4096)
+        for number in range(20):
+            cache.set(f"key-{number}", b"x" * 500)
+        assert cache.get("key-0") is None
+        assert cache.get("key-19") == b"x" * 500
+        size = cache._fetchone("SELECT size FROM usage")[0]
+        assert size <= 4096
+
+    def test_shared_between_processes(self, cache):
+        """A value set in another process is read here."""
+        cache.set("warm", 1)
+        context = multiprocessing.get_context("fork")
+        child = context.Process(target=_set_in_child, args=(cache.path,))
+        child.start()
+        child.join(10)
+        assert child.exitcode == 0
+        assert cache.get("from-child") == {"pid": "child"}
+
+    def test_remove_cache_files(self, cache):
+        """Removing the files starts the next cache empty."""
+        cache.set("key", 1)
+        remove_cache_files(cache.path)
+        assert SharedCache(cache.path).get("key") is None
+
+
+class TestBusy:
+    """Another process holding the write lock."""
+
+    @pytest.fixture
+    def locked(self, cache):
+        """Hold the write lock of ``cache`` from a second connection."""
+        cache.set("key", "value")
+        other = sqlite3.connect(cache.path, isolation_level=None)
+        other.execute("BEGIN IMMEDIATE")
+        yield cache
+        other.execute("ROLLBACK")
+        other.close()
+
+    def test_reads_still_served(self, locked):
+        """WAL readers are not blocked by the writer."""
+        assert locked.get("key") == "value"
+
+    def test_writes_give_up_quickly(self, locked):
+        """A write on a busy cache is skipped rather than waited for."""
+        started = time.monotonic()
+        assert locked.set("other", 1) is False
+        assert locked.inc("counter") is None
+        assert time.monotonic() - started < 1
+
+    def test_deletes_retry_then_fail(self, locked, monkeypatch):
+        """Deletes retry, then report that nothing was deleted."""
+        monkeypatch.setattr(shared_cache, "DELETE_ATTEMPTS", 2)
+        assert locked.delete("key") is False
+        assert locked.delete_many("key") == []
+
+
+class TestPrivateDirectory:
+    """The cache only opens files no one else can write."""
+
+    def test_default_directory_is_per_user(self):
+        """The default path is in a directory named after the user."""
+        directory = os.path.dirname(cache_path())
+        assert directory.endswith(f"-cache-{os.getuid()}")
+
+    def test_creates_private_directory(self, tmp_path):
+        """A missing directory is created closed to other users."""
+        directory = tmp_path / "cache"
+        ensure_private(str(directory))
+        assert directory.stat().st_mode & 0o777 == 0o700
+
+    def test_rejects_shared_directory(self, tmp_path):
+        """A directory others can write to is refused."""
+        directory = tmp_path / "shared"
+        directory.mkdir()
+        directory.chmod(0o777)
+        with pytest.raises(PermissionError):
+            ensure_private(str(directory))
+
+    @pytest.mark.skipif(os.getuid() != 0, reason="Needs root to chown")
+    def test_rejects_foreign_file(self, tmp_path):
+        """A cache file created by another user is never opened."""
+        path = tmp_path / "cache.sqlite"
+        path.write_bytes(b"")
+        os.chown(path, 65534, 65534)
+        with pytest.raises(PermissionError):
+            SharedCache(str(path)).get("key")
+
+
+class TestConfiguration:
+    """Selecting the backend through ``CACHE_TYPE``."""
+
+    def test_cache_type(self, tmp_path):
+        """The backend is built from the app configuration."""
+        app = Flask("my_flask_app")
+        app.config.update(
+            CACHE_TYPE="my_flask_app.shared_cache.SharedCache",
+            CACHE_DIR=str(tmp_path),
+            CACHE_SHARED_MAX_BYTES=1024,
+        )
+        cache = Cache(app)
+        with app.app_context():
+            cache.set("key", "value")
+            assert cache.get("key") == "value"
+        backend = app.extensions["cache"][cache]
+        assert backend.path == cache_path(str(tmp_path), "my_flask_app")
+        assert backend.max_bytes == 1024
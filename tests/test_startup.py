@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Startup phase timing and optional extension tests."""
+import time
+
+import click
+
+from my_flask_app import startup
+from my_flask_app.app import create_app
+from my_flask_app.startup import StartupTimer, parse_import_times
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       300 |        300 |   _io
+import time:      1500 |     140000 |     flask_migrate
+import time:      2000 |       9000 | my_flask_app.metrics
+"""
+
+
+class TestStartupTimer:
+    """Per-phase timing of the app factory."""
+
+    def test_phases_are_recorded(self, app):
+        """The factory leaves its phase timings on the app."""
+        timer = app.extensions["startup"]
+        assert set(timer.phases) == {
+            "config",
+            "extensions",
+            "blueprints",
+            "commands",
+            "logging",
+        }
+        assert timer.report()[0].startswith("create_app: ")
+
+    def test_phase_counts_imports(self):
+        """Modules imported inside a phase are counted."""
+        timer = StartupTimer()
+        with timer.phase("nothing"):
+            pass
+        assert timer.imports["nothing"] == 0
+        assert timer.phases["nothing"] >= 0
+
+    def test_total_stops_with_the_factory(self, app):
+        """The reported total is the factory's duration, not the time since."""
+        timer = app.extensions["startup"]
+        total = timer.total
+        time.sleep(0.01)
+        assert timer.total == total
+
+    def test_report_columns(self, app, monkeypatch):
+        """Import lines list self time first, as the header says."""
+        monkeypatch.setattr(
+            startup,
+            "import_times",
+            lambda limit: [("flask_migrate", 1.5, 140.0)],
+        )
+        result = app.test_cli_runner().invoke(args=["startup-report"])
+        assert "(self / cumulative ms)" in result.output
+        assert "     1.5    140.0  flask_migrate" in result.output
+
+    def test_parse_import_times(self):
+        """Imports are sorted by cumulative milliseconds, header skipped."""
+        assert parse_import_times(IMPORTTIME, limit=2) == [
+            ("flask_migrate", 1.5, 140.0),
+            ("my_flask_app.metrics", 2.0, 9.0),
+        ]
+
+
+class TestOptionalExtensions:
+    """Extensions loaded only where they are used."""
+
+    def test_web_app_skips_migrate(self, app):
+        """A WSGI app does not set up the migration commands."""
+        assert "migrate" not in app.extensions
+
+    def test_cli_loads_migrate(self):
+        """Under a ``flask`` command the ``db`` commands are set up."""
+        with click.Context(click.Command("flask")):
+            app = create_app("tests.settings")
+        assert "migrate" in app.extensions
+
+    def test_eager_mode(self, monkeypatch):
+        """Without ``LAZY_EXTENSIONS`` everything is loaded as before."""
+        monkeypatch.setattr("tests.settings.LAZY_EXTENSIONS", False, raising=False)
+        app = create_app("tests.settings")
+        assert "migrate" in app.extensions
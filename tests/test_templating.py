@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Jinja bytecode cache tests."""
+import os
+
+import pytest
+from jinja2 import FileSystemBytecodeCache
+
+from my_flask_app.app import create_app
+from my_flask_app.templating import TolerantBytecodeCache, template_cache
+
+
+@pytest.fixture
+def cached_app(tmp_path, monkeypatch):
+    """An app storing compiled templates under ``tmp_path``."""
+    monkeypatch.setattr("tests.settings.TEMPLATE_CACHE_ENABLED", True)
+    monkeypatch.setattr(
+        "tests.settings.TEMPLATE_CACHE_DIR", str(tmp_path), raising=False
+    )
+    return create_app("tests.settings")
+
+
+class TestTemplateCache:
+    """Compiled templates on disk."""
+
+    def test_disabled(self, app):
+        """Without the setting templates are compiled in memory only."""
+        assert app.jinja_env.bytecode_cache is None
+
+    def test_precompile_fills_cache(self, cached_app, tmp_path):
+        """Every template is compiled and written to the directory."""
+        assert isinstance(cached_app.jinja_env.bytecode_cache, FileSystemBytecodeCache)
+        compiled, failed = template_cache.precompile(cached_app)
+        assert failed == []
+        assert compiled == len(os.listdir(tmp_path)) > 0
+
+    def test_new_worker_loads_compiled_templates(self, cached_app, monkeypatch):
+        """A second app reads the cached code instead of compiling the source."""
+        template_cache.precompile(cached_app)
+        other = create_app("tests.settings")
+        compiled = []
+        monkeypatch.setattr(
+            other.jinja_env, "compile", lambda *args, **kwargs: compiled.append(args)
+        )
+        other.jinja_env.get_template("layout.html")
+        assert compiled == []
+
+    def test_uncreatable_directory(self, monkeypatch, tmp_path):
+        """A directory that cannot be created disables the cache, not the app."""
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        monkeypatch.setattr("tests.settings.TEMPLATE_CACHE_ENABLED", True)
+        monkeypatch.setattr(
+            "tests.settings.TEMPLATE_CACHE_DIR", str(blocker / "cache"), raising=False
+        )
+        app = create_app("tests.settings")
+        assert app.jinja_env.bytecode_cache is None
+        assert app.jinja_env.get_template("layout.html")
+
+    def test_unwritable_directory(self, cached_app, tmp_path):
+        """Failing to store compiled code does not fail the render."""
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        cached_app.jinja_env.bytecode_cache = TolerantBytecodeCache(str(blocker))
+        assert cached_app.jinja_env.get_template("layout.html")
+        assert cached_app.jinja_env.bytecode_cache.warned
+
+    def test_cli(self, cached_app):
+        """``flask precompile-templates`` reports what it compiled."""
+        result = cached_app.test_cli_runner().invoke(args=["precompile-templates"])
+        assert result.exit_code == 0
+        assert "Compiled " in result.output